@@ -0,0 +1,165 @@
+"""
+
+A few tools for measuring what each table costs the server to host, for working out how many tables a server can take:
+a Meter (CPU time, messages and bytes for one table), a MeteredSocket (which counts the bytes going through a socket)...
+...and a function for measuring how much memory a game takes up.
+
+"""
+
+import sys
+
+from collections import Counter, deque
+from threading import Lock
+from time import monotonic, thread_time
+from types import FunctionType, ModuleType
+
+
+class Meter(object):
+	"""
+
+	Running totals for one table, updated by the table's writer and by the threads handling its players' connections.
+	'GameCPU' is the CPU time the writer has spent stepping the table, and 'HandlerCPU' the time spent on its messages.
+
+	"""
+
+	__slots__ = 'Started', 'GameCPU', 'HandlerCPU', 'Steps', 'Messages', 'Bytes', 'Recent', 'lock'
+
+	# Messages per second are given over (roughly) this many seconds.
+	Window = 10
+
+	def __init__(self):
+		self.Started = monotonic()
+		self.GameCPU = 0.0
+		self.HandlerCPU = 0.0
+		self.Steps = 0
+		self.Messages = 0
+
+		# [bytes received, bytes sent] for each seat at the table.
+		self.Bytes = {}
+
+		# (second, messages) pairs, for the last Window seconds.
+		self.Recent = deque()
+		self.lock = Lock()
+
+	def Step(self, CPU):
+		with self.lock:
+			self.GameCPU += CPU
+			self.Steps += 1
+
+	def Message(self, CPU):
+		Second = int(monotonic())
+
+		with self.lock:
+			self.HandlerCPU += CPU
+			self.Messages += 1
+
+			if self.Recent and self.Recent[-1][0] == Second:
+				self.Recent[-1][1] += 1
+			else:
+				self.Recent.append([Second, 1])
+
+				while self.Recent[0][0] <= Second - self.Window:
+					self.Recent.popleft()
+
+	def Transfer(self, Seat, Received=0, Sent=0):
+		with self.lock:
+			Totals = self.Bytes.setdefault(Seat, [0, 0])
+			Totals[0] += Received
+			Totals[1] += Sent
+
+	def MessageRate(self):
+		Now = monotonic()
+
+		with self.lock:
+			Messages = sum(Count for Second, Count in self.Recent if Second > Now - self.Window)
+
+		return Messages / min(self.Window, max(1.0, Now - self.Started))
+
+	def Usage(self):
+		Elapsed = monotonic() - self.Started
+		MessageRate = self.MessageRate()
+
+		with self.lock:
+			return {
+				'Uptime': Elapsed,
+				'GameCPU': self.GameCPU,
+				'HandlerCPU': self.HandlerCPU,
+				'CPUShare': (self.GameCPU + self.HandlerCPU) / Elapsed if Elapsed else 0.0,
+				'Steps': self.Steps,
+				'Messages': self.Messages,
+				'MessageRate': MessageRate,
+				'Bytes': {Seat: tuple(Totals) for Seat, Totals in sorted(self.Bytes.items())}
+			}
+
+
+class MeteredSocket(object):
+	"""Stands in for a connection's socket when sending and receiving messages, counting the bytes for one seat"""
+
+	__slots__ = 'conn', 'meter', 'player'
+
+	def __init__(self, conn, meter, player):
+		self.conn = conn
+		self.meter = meter
+		self.player = player
+
+	def recv(self, *args):
+		Data = self.conn.recv(*args)
+		self.meter.Transfer(self.player.playerindex, Received=len(Data))
+		return Data
+
+	def sendall(self, Data):
+		self.conn.sendall(Data)
+		self.meter.Transfer(self.player.playerindex, Sent=len(Data))
+
+
+class CPUTimer(object):
+	"""Context manager measuring the CPU time used by the current thread inside the 'with' block"""
+
+	__slots__ = 'Record', 'Start'
+
+	def __init__(self, Record):
+		self.Record = Record
+
+	def __enter__(self):
+		self.Start = thread_time()
+
+	def __exit__(self, *args):
+		self.Record(thread_time() - self.Start)
+
+
+def Footprint(Root):
+	"""
+
+	Roughly how much memory an object takes up, including everything it refers to (counting each object once).
+	Returns a Counter of bytes by type name, and a Counter of how many objects of each type there are.
+
+	"""
+
+	Bytes, Objects = Counter(), Counter()
+	Seen, Stack = set(), [Root]
+
+	while Stack:
+		if id(Object := Stack.pop()) in Seen or isinstance(Object, (type, FunctionType, ModuleType)):
+			continue
+
+		Seen.add(id(Object))
+		Name = type(Object).__name__
+		Bytes[Name] += sys.getsizeof(Object)
+		Objects[Name] += 1
+
+		if isinstance(Object, dict):
+			Stack.extend(Object.keys())
+			Stack.extend(Object.values())
+		elif isinstance(Object, (list, tuple, set, frozenset, deque)):
+			Stack.extend(Object)
+		else:
+			for Class in type(Object).__mro__:
+				if isinstance(Slots := Class.__dict__.get('__slots__', ()), str):
+					Slots = (Slots,)
+
+				Stack.extend(getattr(Object, name) for name in Slots if hasattr(Object, name))
+
+			if hasattr(Object, '__dict__'):
+				Stack.append(Object.__dict__)
+
+	return Bytes, Objects
@@ -0,0 +1,98 @@
+"""
+
+Two classes for protecting a busy server from taking on more work than it can handle:
+a LoadMonitor, which decides whether new players should be turned away...
+...and a RateLimiter, which caps how quickly a single connection can send messages.
+
+"""
+
+from os import cpu_count
+from threading import Thread, Lock
+from time import monotonic, process_time, sleep
+
+
+class LoadMonitor(object):
+	"""
+
+	Class that keeps track of how overloaded the server is, using a background thread.
+
+	'Lag' is how much later than requested the monitoring thread wakes up from a short sleep:
+	when the server's threads are all fighting over the CPU (or the GIL), this goes up sharply.
+	'CPU' is the percentage of one CPU core that the server process has used over the last interval.
+
+	"""
+
+	__slots__ = 'MaxLag', 'MaxCPU', 'Interval', 'Lag', 'CPU'
+
+	def __init__(self, MaxLag=0, MaxCPU=0, Interval=0.25):
+		self.MaxLag = MaxLag
+		self.MaxCPU = MaxCPU
+		self.Interval = Interval
+		self.Lag = 0.0
+		self.CPU = 0.0
+
+		if MaxLag or MaxCPU:
+			Thread(target=self.Monitor, daemon=True).start()
+
+	def Monitor(self):
+		WallTime, CPUTime = monotonic(), process_time()
+
+		while True:
+			sleep(self.Interval)
+			NewWallTime, NewCPUTime = monotonic(), process_time()
+			Elapsed = NewWallTime - WallTime
+
+			# Exponentially-weighted averages, so that a single slow wake-up doesn't turn everybody away.
+			self.Lag = (0.7 * self.Lag) + (0.3 * max(0.0, (Elapsed - self.Interval) * 1000))
+			self.CPU = (0.7 * self.CPU) + (0.3 * (100 * (NewCPUTime - CPUTime) / Elapsed))
+
+			WallTime, CPUTime = NewWallTime, NewCPUTime
+
+	def Overloaded(self):
+		"""Returns the reason the server is overloaded, or an empty string if it isn't"""
+
+		if self.MaxLag and self.Lag > self.MaxLag:
+			return f'server lag is {self.Lag:.0f}ms'
+
+		if self.MaxCPU and self.CPU > self.MaxCPU:
+			return f'server CPU usage is {self.CPU:.0f}%'
+
+		return ''
+
+	def Report(self):
+		return {'Lag': round(self.Lag, 1), 'CPU': round(self.CPU, 1), 'Cores': cpu_count()}
+
+
+class RateLimiter(object):
+	"""
+
+	Token-bucket limiter for the messages received from one connection.
+	Rather than dropping messages (which would break the client's request/response protocol)...
+	...a connection that goes over its limit is simply made to wait before its next message is handled.
+
+	"""
+
+	__slots__ = 'Rate', 'Capacity', 'Tokens', 'LastTime', 'lock'
+
+	def __init__(self, Rate, Burst=None):
+		self.Rate = Rate
+		self.Capacity = Burst or max(1.0, Rate / 4)
+		self.Tokens = self.Capacity
+		self.LastTime = monotonic()
+		self.lock = Lock()
+
+	def Throttle(self):
+		"""Block until the connection is allowed to send another message"""
+
+		if not self.Rate:
+			return None
+
+		with self.lock:
+			Now = monotonic()
+			self.Tokens = min(self.Capacity, self.Tokens + ((Now - self.LastTime) * self.Rate))
+			self.LastTime = Now
+			self.Tokens -= 1
+			Wait = -self.Tokens / self.Rate if self.Tokens < 0 else 0
+
+		if Wait:
+			sleep(Wait)
@@ -0,0 +1,205 @@
+"""
+
+A bid advisor for Knock: given a player's hand, the trump card and the number of players...
+...it deals the unseen cards out to the other players at random many times, plays out each deal (or solves it)...
+...and counts how many tricks the hand won, for the chance of winning each number of tricks and the best bid.
+
+The deals are shared out between worker processes, which keep dealing until a deadline: so a bot can have an answer...
+...that is good enough within a fifth of a second, and offline analysis can give it as long as it likes.
+Each worker plays its deals in batches small enough to finish before the deadline, and hands back what it has done.
+
+Run this script to advise on a hand: python Advisor.py <players> <seats after the leader> <trump card> <cards...>
+(with cards written as on the client, e.g. 10H, QS or 2C: python Advisor.py 4 1 7D AS KS 10D 3C)
+
+"""
+
+import os, sys
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from random import Random
+from time import time
+
+import Rules
+
+from Simulator import GreedyMove, GreedyPolicy, HandFeatures, Playout, TrickStatistics, np
+from Solver import Solver
+
+
+def Evaluate(Hand, TrumpCard, PlayerNumber, Position, Method, Seed, Deadline, Samples):
+	"""
+
+	Run in a worker process: deal the cards Hand can't see to the other seats, Samples times (or until Deadline)...
+	...and return how many deals Hand won each number of tricks in, when it sits Position seats after the leader.
+	Method is 'Playout' (everyone plays greedily: see Simulator.GreedyPolicy) or 'Solver'...
+	...(the most tricks Hand can make sure of, if it could see every card: much slower, for small hands offline).
+
+	Playouts always play at least one deal (which takes a millisecond or so), however late the worker starts.
+	A deal the Solver hasn't finished by Deadline is given up on, so that the worker is free again on time.
+
+	"""
+
+	CardNumber, TrumpSuit = len(Hand), TrumpCard // 13
+	Unseen = [card for card in range(52) if card != TrumpCard and card not in Hand]
+	Others = [Seat for Seat in range(PlayerNumber) if Seat != Position]
+	Counts = [0] * (CardNumber + 1)
+	Done = 0
+
+	# Playouts with NumPy are played a batch at a time; anything else one deal at a time.
+	if Method == 'Playout' and np:
+		random = np.random.default_rng(Seed)
+		Batch = 16
+
+		while Done < Samples and ((Start := time()) < Deadline or not Done):
+			Deals = min(Batch, Samples - Done)
+			Cards = random.random((Deals, len(Unseen))).argsort(axis=1)[:, :len(Others) * CardNumber]
+
+			Hands = np.zeros((Deals, PlayerNumber, 52), dtype=bool)
+			Hands[:, Position, Hand] = True
+			Hands[np.arange(Deals)[:, None, None], np.array(Others)[None, :, None],
+			      np.array(Unseen)[Cards].reshape(Deals, len(Others), CardNumber)] = True
+
+			Tricks = Playout(Hands, np.full(Deals, TrumpSuit), random).Play(GreedyPolicy)[:, Position]
+			Counts = [Count + int(Extra) for Count, Extra in zip(Counts, np.bincount(Tricks, minlength=CardNumber + 1))]
+			Done += Deals
+
+			# The next batch is sized from how fast this one went, to take at most half the time left before Deadline.
+			PerDeal = max(time() - Start, 1e-6) / Deals
+			Batch = int(max(1, min(256, (Deadline - time()) / (2 * PerDeal))))
+
+		return Counts
+
+	random = Random(Seed)
+
+	while Done < Samples and (time() < Deadline or not (Done or Method == 'Solver')):
+		Dealt = random.sample(Unseen, len(Others) * CardNumber)
+		Dealt[Position * CardNumber:Position * CardNumber] = Hand
+
+		if Method == 'Solver':
+			Hands = [Rules.Bitboard(Dealt[Seat * CardNumber:(Seat + 1) * CardNumber]) for Seat in range(PlayerNumber)]
+			try:
+				Tricks = Solver(Hands, TrumpSuit, Deadline=Deadline).MaxTricks(Position)
+			except TimeoutError:
+				break
+		else:
+			# (Engine.Deal turns up the last card of the pack for trumps, then deals each hand from the end.)
+			engine = Rules.Engine(PlayerNumber, CardNumber)
+			engine.Deal(Pack=Dealt[::-1] + [TrumpCard])
+
+			for Seat in range(PlayerNumber):
+				engine.Bid(Seat, 0)
+
+			while engine.Phase == 'Play':
+				engine.Play(engine.Turn, GreedyMove(engine, engine.Turn))
+
+			Tricks = engine.Tricks[Position]
+
+		Counts[Tricks] += 1
+		Done += 1
+
+	return Counts
+
+
+class Advisor(object):
+	"""
+
+	Keeps a pool of worker processes for advising on bids, so that each piece of advice doesn't wait for them to start:
+	make one when the server (or an analysis script) starts, call Advise as often as needed, and Close it at the end.
+
+	"""
+
+	__slots__ = 'Workers', 'Pool'
+
+	# Workers stop Margin seconds before the deadline, to leave time for their results to come back...
+	# ...and the results are waited for until Slack seconds after it, in case a worker is held up.
+	Margin = 0.005
+	Slack = 0.02
+
+	def __init__(self, Workers=None):
+		self.Workers = Workers or os.cpu_count() or 1
+		self.Pool = None
+
+	def Start(self):
+		"""Start the worker processes (and have each import the modules it needs), if they haven't been already"""
+
+		if not self.Pool:
+			self.Pool = ProcessPoolExecutor(self.Workers)
+			wait([self.Pool.submit(Evaluate, [0], 1, 2, 0, 'Playout', 0, 0, 0) for i in range(self.Workers)])
+
+		return self
+
+	def Close(self):
+		# (Workers never run for long past the deadline they were given, so this doesn't keep the caller waiting.)
+		if self.Pool:
+			self.Pool.shutdown()
+			self.Pool = None
+
+	def Advise(self, Hand, TrumpCard, PlayerNumber, Position=0, Budget=0.2, Samples=None, Method='Playout', Seed=None):
+		"""
+
+		Advice on bidding with Hand (a list of card indices), sitting Position seats after the round's leader:
+		returns the TrickStatistics of the deals played out, whose BestBid is the bid to make...
+		...because a bid scores the same for every trick won, plus ten if it is made exactly (see Rules.RoundPoints).
+
+		Deals are played out until Budget seconds have passed (allowing a few milliseconds to collect the results)...
+		...or Samples have been, if that is given: with Budget None, exactly Samples are (reproducibly, given a Seed).
+		The results are waited for a little past the Budget, and for at least one worker, so there are always some deals.
+
+		"""
+
+		assert Budget is not None or Samples, 'Give a time budget, a number of samples, or both.'
+
+		self.Start()
+		Start = time()
+		Deadline = Start + Budget if Budget is not None else float('inf')
+		Seed = Rules.NewSeed() if Seed is None else Seed
+		Hand = sorted(Hand)
+
+		# Each worker gets its own share of the samples, and its own seed (in the same way as Rules.RoundSeed).
+		Shares = [(Samples or 10 ** 9) // self.Workers + (Worker < (Samples or 0) % self.Workers)
+		          for Worker in range(self.Workers)]
+
+		Futures = [self.Pool.submit(Evaluate, Hand, TrumpCard, PlayerNumber, Position, Method,
+		                            Random(f'{Seed}/{Worker}').getrandbits(63), Deadline - self.Margin, Share)
+		           for Worker, Share in enumerate(Shares) if Share]
+
+		Done, Late = wait(Futures, timeout=Deadline - time() + self.Slack if Budget is not None else None)
+
+		if not Done:
+			Done, Late = wait(Futures, return_when=FIRST_COMPLETED)
+
+		# (A worker that is still busy, e.g. one that only started late, is left to finish: its results are left out.)
+		for Future in Late:
+			Future.cancel()
+
+		Statistics = TrickStatistics(PlayerNumber, len(Hand))
+		TrumpLength, HighCards = HandFeatures(Hand, TrumpCard // 13)
+
+		for Future in Done:
+			for Tricks, Count in enumerate(Future.result()):
+				if Count:
+					Statistics.Add(TrumpLength, HighCards, Position, Tricks, Count)
+					Statistics.Deals += Count
+
+		Statistics.Seconds = time() - Start
+		return Statistics
+
+
+if __name__ == '__main__':
+	from Card import CardsByID
+
+	if len(sys.argv) < 5:
+		sys.exit('Usage: Advisor.py <players> <seats after the leader> <trump card> <cards...>')
+
+	PlayerNumber, Position = int(sys.argv[1]), int(sys.argv[2])
+	TrumpCard, Hand = CardsByID[sys.argv[3]].Index, [CardsByID[ID].Index for ID in sys.argv[4:]]
+	advisor = Advisor()
+
+	for Budget in (0.2, 2.0):
+		Statistics = advisor.Advise(Hand, TrumpCard, PlayerNumber, Position, Budget)
+		Bid, Chance = Statistics.BestBid()
+
+		print(f'In {Budget}s: {Statistics.Deals} deals, {Statistics.ExpectedTricks():.2f} tricks on average; '
+		      f'bid {Bid} ({Chance:.0%}). Chance of each number of tricks: '
+		      + ', '.join(f'{Chance:.0%}' for Chance in Statistics.Distribution()))
+
+	advisor.Close()
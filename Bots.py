@@ -0,0 +1,75 @@
+"""A few functions used by the server to make decisions on behalf of bot players."""
+
+import Rules
+
+
+def LegalCards(Hand, PlayedCards):
+	"""The cards in Hand that may be played (see Rules.LegalMoves)"""
+
+	Legal = Rules.LegalMoves([card.Index for card in Hand], [card.Index for card in PlayedCards[:1]])
+	return [card for card in Hand if card.Index in Legal]
+
+
+def LowestCard(Hand, PlayedCards, TrumpSuit):
+	"""The card played on behalf of a player who has run out of time: their lowest legal card, keeping trumps if possible"""
+
+	return min(LegalCards(Hand, PlayedCards), key=lambda card: (card.ActualSuit == TrumpSuit, card.ActualValue))
+
+
+def WinValue(card, SuitLed, TrumpSuit):
+	"""Rules.WinValue, for a Card object (with the suits given as letters)"""
+
+	return Rules.WinValue(card.Index, Rules.Suits.index(SuitLed), Rules.Suits.index(TrumpSuit))
+
+
+def ChooseBid(player, TrumpSuit):
+	"""Rough estimate of how many tricks a hand will win: high trumps, plus aces and well-guarded kings."""
+
+	Estimate = 0
+
+	for card in player.Hand:
+		SuitLength = sum(1 for other in player.Hand if other.ActualSuit == card.ActualSuit)
+
+		if card.ActualSuit == TrumpSuit:
+			Estimate += 1 if card.ActualValue >= 11 else (0.5 if card.ActualValue >= 8 else 0.25)
+		elif card.ActualValue == 14:
+			Estimate += 1
+		elif card.ActualValue == 13 and SuitLength >= 2:
+			Estimate += 0.5
+
+	return min(len(player.Hand), round(Estimate))
+
+
+def ChooseCard(player, PlayedCards, TrumpSuit):
+	"""
+
+	Try to win exactly as many tricks as the bot has bid:
+	win as cheaply as possible while it still needs tricks, and get rid of dangerous cards once it doesn't.
+
+	"""
+
+	Legal = LegalCards(player.Hand, PlayedCards)
+	WantsTricks = player.Tricks < player.Bid
+
+	if not PlayedCards:
+		# Leading: if we want tricks, lead our strongest card; otherwise lead our weakest.
+		Strength = lambda card: (card.ActualSuit == TrumpSuit, card.ActualValue)
+		return max(Legal, key=Strength) if WantsTricks else min(Legal, key=Strength)
+
+	SuitLed = PlayedCards[0].ActualSuit
+	Value = lambda card: WinValue(card, SuitLed, TrumpSuit)
+	BestSoFar = max(Value(card) for card in PlayedCards)
+
+	Winners = [card for card in Legal if Value(card) > BestSoFar]
+	Losers = [card for card in Legal if Value(card) <= BestSoFar]
+
+	if WantsTricks:
+		if Winners:
+			return min(Winners, key=Value)
+
+		return min(Legal, key=lambda card: (card.ActualSuit == TrumpSuit, card.ActualValue))
+
+	if Losers:
+		return max(Losers, key=lambda card: (Value(card), card.ActualValue))
+
+	return min(Winners, key=Value)
@@ -1,150 +1,57 @@
-from os import environ
-environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
-from pygame import Rect
+from Rules import CardSuit, CardValue, FollowsSuit
 
 
 class Card(object):
-	"""Class representing a playing card from a standard deck (excluding jokers"""
+	"""
 
-	ActualValue: int
-	ActualSuit: str
+	Class representing a playing card from a standard deck (excluding jokers).
+	There are only ever 52 of these (see Cards below), made when this module is imported, and they never change:
+	which player holds a card and where it is drawn are kept elsewhere, by card index.
 
-	__slots__ = 'ActualValue', 'ActualSuit', 'value', 'suit', 'PlayedBy', 'winvalue', 'ID', 'rect', 'colliderect', \
-	            'PosIndex', 'CurrentTrumpSuit', 'Suits'
+	"""
 
-	OriginalSuits = ['C', 'D', 'S', 'H']
+	ActualValue: int
+	ActualSuit: str
 
-	def __init__(self, ActualValue: int, ActualSuit: str):
-		self.ActualValue = ActualValue
-		self.ActualSuit = ActualSuit
+	__slots__ = 'Index', 'ActualValue', 'ActualSuit', 'value', 'suit', 'ID'
 
-		ValueMap = {11: 'Jack', 12: 'Queen', 13: 'King', 14: 'Ace',
-		            'D': 'Diamonds', 'C': 'Clubs', 'H': 'Hearts', 'S': 'Spades'}
+	ValueMap = {11: 'Jack', 12: 'Queen', 13: 'King', 14: 'Ace',
+	            'D': 'Diamonds', 'C': 'Clubs', 'H': 'Hearts', 'S': 'Spades'}
 
-		self.value = self.ActualValue if (2 <= self.ActualValue <= 10) else ValueMap[self.ActualValue]
-		self.suit = ValueMap[self.ActualSuit]
-		self.PlayedBy = 'Undetermined'
-		self.winvalue = 0
+	def __init__(self, Index):
+		self.Index = Index
+		self.ActualValue = CardValue(Index)
+		self.ActualSuit = CardSuit(Index)
+		self.value = self.ActualValue if (2 <= self.ActualValue <= 10) else self.ValueMap[self.ActualValue]
+		self.suit = self.ValueMap[self.ActualSuit]
 		self.ID = f'{self.ActualValue if self.ActualValue <= 10 else self.value[0]}{self.ActualSuit}'
-		self.PosIndex = -1
-		self.rect = Rect(0, 0, 79, 121)
-		self.colliderect = Rect(0, 0, 79, 121)
-		self.CurrentTrumpSuit = ''
-		self.Suits = self.OriginalSuits
-
-	def AddToHand(self, player, CardPos):
-		self.PlayedBy = player
-		self.SetPos(CardPos)
-		return self
-
-	def SetPos(self, Index):
-		self.PosIndex = Index
-		return self
-
-	def DetermineWinValue(self, playedsuit, trump):
-		self.winvalue = self.ActualValue if self.ActualSuit == playedsuit else (
-			self.ActualValue + 13 if self.ActualSuit == trump else 0)
-		return self
-
-	def GetWinValue(self):
-		return self.winvalue
-
-	def SetTrumpSuit(self, TrumpSuit):
-		self.CurrentTrumpSuit = TrumpSuit
-		TrumpIndex = Card.OriginalSuits.index(self.CurrentTrumpSuit)
-		self.Suits = Card.OriginalSuits[(TrumpIndex + 1):] + Card.OriginalSuits[:(TrumpIndex + 1)]
-		return self
-
-	def SuitAndValue(self):
-
-		"""Method for sorting the cards in a player's hand, in most eventualities"""
-
-		return self.Suits.index(self.ActualSuit), self.ActualValue
-
-	def SuitAndValueWithoutDiamonds(self):
-
-		"""
-
-		Method for sorting the cards in a player's hand, in the eventuality...
-		 ...that the only suit the player lacks is Diamonds
-
-		"""
-
-		SuitDict = {
-			'C': 3 if self.CurrentTrumpSuit == 'C' else 1,
-			'H': 2,
-			'S': 1 if self.CurrentTrumpSuit == 'C' else 3
-		}
-
-		return SuitDict[self.ActualSuit], self.ActualValue
-
-	def SuitAndValueWithoutSpades(self):
 
-		"""
+	def __reduce__(self):
+		"""Cards are pickled as their index, and unpickled as the same card object"""
 
-		Method for sorting the cards in a player's hand, in the eventuality...
-		...that the only suit the player lacks is Spades
+		return CardFromIndex, (self.Index,)
 
-		"""
+	def Click(self, game, MousePos, colliderect):
+		"""colliderect is where the card can be clicked on the client's screen (None if it isn't drawn yet)"""
 
-		SuitDict = {
-			'D': 3 if self.CurrentTrumpSuit == 'D' else 1,
-			'C': 2,
-			'H': 1 if self.CurrentTrumpSuit == 'D' else 3
-		}
-
-		return SuitDict[self.ActualSuit], self.ActualValue
-
-	def SuitAndValueWithoutHearts(self):
-
-		"""
-
-		Method for sorting the cards in a player's hand, in the eventuality...
-		...that the only suit the player lacks is Hearts
-
-		"""
-
-		SuitDict = {
-			'S': 3 if self.CurrentTrumpSuit == 'S' else 1,
-			'D': 2,
-			'C': 1 if self.CurrentTrumpSuit == 'S' else 3
-		}
-
-		return SuitDict[self.ActualSuit], self.ActualValue
-
-	def SuitAndValueWithoutClubs(self):
-
-		"""
-
-		Method for sorting the cards in a player's hand, in the eventuality...
-		...that the only suit the player lacks is Clubs
-
-		"""
-
-		SuitDict = {
-			'H': 3 if self.CurrentTrumpSuit == 'H' else 1,
-			'S': 2,
-			'D': 1 if self.CurrentTrumpSuit == 'H' else 3
-		}
-
-		return SuitDict[self.ActualSuit], self.ActualValue
-
-	def Click(self, game, MousePos):
-		if not self.colliderect.collidepoint(*MousePos):
+		if not (colliderect and colliderect.collidepoint(*MousePos)):
 			return 'Not clicked'
 
-		if game.Attributes.Trick['PlayedCards']:
-			SuitLed = game.Attributes.Trick['PlayedCards'][0].ActualSuit
-
-			Condition = any(
-				UnplayedCard.ActualSuit == SuitLed
-				for UnplayedCard in game.Attributes.Tournament['gameplayers'][self.PlayedBy.playerindex].Hand
-			)
+		PlayedCards = game.Attributes.Trick['PlayedCards']
+		Holder = game.Attributes.Tournament['gameplayers'][game.Attributes.Round['Holders'][self.Index]]
 
-			if self.ActualSuit != SuitLed and Condition:
-				return 'You tried to play an illegal move! Maybe try again?'
+		if not FollowsSuit(self.Index, PlayedCards[0].Index // 13 if PlayedCards else -1, Holder.SuitCounts):
+			return 'You tried to play an illegal move! Maybe try again?'
 
 		return None
 
 	def __repr__(self):
 		return f'{self.value} of {self.suit}'
+
+
+Cards = tuple(Card(Index) for Index in range(52))
+CardsByID = {card.ID: card for card in Cards}
+
+
+def CardFromIndex(Index):
+	return Cards[Index]
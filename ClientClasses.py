@@ -1,9 +1,9 @@
 """A smattering of short classes and functions to make the Client script cleaner."""
 
-from Player import Player
 from ipaddress import ip_address
-import socket
+import socket, json
 from itertools import groupby
+from os import path
 
 
 class Triggers(object):
@@ -14,7 +14,7 @@ class Triggers(object):
 
 	 """
 
-	__slots__ = 'Events', 'Surfaces'
+	__slots__ = 'Events', 'Surfaces', 'Timestamps'
 
 	def __init__(self):
 		self.Events = {
@@ -38,6 +38,9 @@ class Triggers(object):
 			'CurrentBoard': 0,
 		}
 
+		# When (in the server's time) each event last happened.
+		self.Timestamps = {}
+
 
 class AttributeTracker(object):
 	"""This class holds information about the current state of play"""
@@ -51,7 +54,7 @@ class AttributeTracker(object):
 			'MaxGamesWon': 0,
 			'PlayerNumber': PlayerNumber,
 			'MaxCardNumber': (51 // PlayerNumber) if server else 0,
-			'gameplayers': Player.AllPlayers if server else []
+			'gameplayers': []
 		}
 
 		self.Game = {
@@ -66,6 +69,12 @@ class AttributeTracker(object):
 			'CardNumberThisRound': 0,
 			'TrumpCard': None,
 			'trumpsuit': '',
+
+			# The seed the pack was shuffled from this round (see Rules.RoundSeed).
+			'Seed': None,
+
+			# The seat holding each card this round (or that played it), by card index.
+			'Holders': bytearray(52),
 			'RoundLeader': None
 		}
 
@@ -138,3 +147,31 @@ def AllEqual(Iterable):
 
 	g = groupby(Iterable)
 	return next(g, True) and not next(g, False)
+
+
+# The resume token each server gave us for our seat, so that we can get the seat back if the server restarts.
+ResumeTokensPath = path.join(path.expanduser('~'), '.knock-resume-tokens.json')
+
+
+def LoadResumeToken(IP, Port):
+	try:
+		with open(ResumeTokensPath) as f:
+			return json.load(f).get(f'{IP}:{Port}', '')
+	except (OSError, ValueError):
+		return ''
+
+
+def SaveResumeToken(IP, Port, Token):
+	try:
+		with open(ResumeTokensPath) as f:
+			Tokens = json.load(f)
+	except (OSError, ValueError):
+		Tokens = {}
+
+	Tokens[f'{IP}:{Port}'] = Token
+
+	try:
+		with open(ResumeTokensPath, 'w') as f:
+			json.dump(Tokens, f)
+	except OSError:
+		pass
@@ -0,0 +1,14 @@
+"""
+
+A one-line function for returning the current time in a fixed format, for the server's messages...
+...kept in a module of its own, so that scripts can use it without needing the networking code's dependencies.
+
+"""
+
+from datetime import datetime
+
+
+def GetTime():
+	"""Function to get the time in a fixed format"""
+
+	return datetime.now().strftime("%H:%M:%S")
@@ -0,0 +1,205 @@
+"""
+
+Two classes for keeping a record of every table on disk, so that a server that dies can pick up where it left off:
+an EventLog (one table's log of events, plus a snapshot of the table that the log starts from)...
+...and a LogWriter, a background thread making the disk writes for every table's log.
+
+"""
+
+import os, pickle, struct, traceback
+
+from collections import deque
+from threading import Thread, Condition, Event
+
+from Clock import GetTime
+
+
+def Record(Object):
+	"""Pickle Object, with a header giving its length"""
+
+	Pickled = pickle.dumps(Object)
+	return struct.pack('>I', len(Pickled)) + Pickled
+
+
+def ReadRecords(Path):
+	"""Yields each complete record in a file (a record that was only partly written before a crash is ignored)"""
+
+	try:
+		with open(Path, 'rb') as f:
+			while len(Header := f.read(4)) == 4:
+				Length = struct.unpack('>I', Header)[0]
+
+				if len(Pickled := f.read(Length)) < Length:
+					break
+
+				yield pickle.loads(Pickled)
+	except FileNotFoundError:
+		return None
+
+
+class EventLog(object):
+	"""
+
+	The log of one table, in Directory: 'table-N.snapshot' holds the table's state as of event number 'Sequence'...
+	...and 'table-N.log' holds batches of the events since then, each batch tagged with the number of its first event.
+
+	"""
+
+	__slots__ = 'Writer', 'LogPath', 'SnapshotPath', 'Events'
+
+	def __init__(self, Writer, Directory, TableID):
+		self.Writer = Writer
+		self.LogPath = os.path.join(Directory, f'table-{TableID}.log')
+		self.SnapshotPath = os.path.join(Directory, f'table-{TableID}.snapshot')
+
+		# How many events have been logged since the last snapshot.
+		self.Events = 0
+
+	def Append(self, Sequence, Events, Callback=None):
+		"""Log a batch of events; Callback() is called once they are safely on disk"""
+
+		self.Events += len(Events)
+		self.Writer.Submit(self.WriteEvents, Record((Sequence, Events)), Callback=Callback)
+
+	def Snapshot(self, State):
+		"""Replace the snapshot with State (a dict that must include 'Sequence'), and empty the log"""
+
+		self.Events = 0
+		self.Writer.Submit(self.WriteSnapshot, Record(State))
+
+	def Delete(self):
+		self.Writer.Submit(self.DeleteFiles)
+
+	def Load(self):
+		"""Returns the snapshot and the events logged since it was taken, or (None, []) if there's nothing on disk"""
+
+		State = next(ReadRecords(self.SnapshotPath), None)
+
+		if State is None:
+			return None, []
+
+		Events = [
+			Event
+			for Sequence, Batch in ReadRecords(self.LogPath)
+			for i, Event in enumerate(Batch)
+
+			# (Events from before the snapshot are still in the log if the server died while taking it.)
+			if Sequence + i >= State['Sequence']
+		]
+
+		self.Events = len(Events)
+		return State, Events
+
+	# The remaining functions are only called by the LogWriter's thread.
+
+	def WriteEvents(self, Writer, Data):
+		f = Writer.File(self.LogPath)
+		f.write(Data)
+		return f
+
+	def WriteSnapshot(self, Writer, Data):
+		Temporary = f'{self.SnapshotPath}.tmp'
+
+		with open(Temporary, 'wb') as f:
+			f.write(Data)
+			f.flush()
+			os.fsync(f.fileno())
+
+		os.replace(Temporary, self.SnapshotPath)
+		Writer.SyncDirectory(os.path.dirname(self.SnapshotPath))
+		Writer.Truncate(self.LogPath)
+
+	def DeleteFiles(self, Writer):
+		Writer.Close(self.LogPath)
+
+		for Path in (self.LogPath, self.SnapshotPath):
+			try:
+				os.remove(Path)
+			except FileNotFoundError:
+				pass
+
+
+class LogWriter(object):
+	"""
+
+	Background thread that makes every table's disk writes, in the order they were submitted.
+	Each time it wakes up, it makes every write that is waiting and then syncs each file it has written to only once...
+	...so a busy server pays for one fsync per file per batch, however many events are in the batch.
+
+	"""
+
+	__slots__ = 'Queue', 'Changed', 'Files'
+
+	def __init__(self):
+		self.Queue = deque()
+		self.Changed = Condition()
+		self.Files = {}
+		Thread(target=self.Run, daemon=True).start()
+
+	def Submit(self, Function, *args, Callback=None):
+		"""Function(self, *args) is called by the writer's thread, then Callback() once the write is on disk"""
+
+		with self.Changed:
+			self.Queue.append((Function, args, Callback))
+			self.Changed.notify()
+
+	def Flush(self):
+		"""Block until every write submitted so far is on disk"""
+
+		Done = Event()
+		self.Submit(lambda Writer: None, Callback=Done.set)
+		Done.wait()
+
+	def File(self, Path):
+		if Path not in self.Files:
+			self.Files[Path] = open(Path, 'ab')
+
+		return self.Files[Path]
+
+	def Close(self, Path):
+		if f := self.Files.pop(Path, None):
+			f.close()
+
+	def Truncate(self, Path):
+		self.Close(Path)
+		open(Path, 'wb').close()
+
+	@staticmethod
+	def SyncDirectory(Directory):
+		fd = os.open(Directory or '.', os.O_RDONLY)
+
+		try:
+			os.fsync(fd)
+		finally:
+			os.close(fd)
+
+	def Run(self):
+		while True:
+			with self.Changed:
+				while not self.Queue:
+					self.Changed.wait()
+
+				Batch, self.Queue = self.Queue, deque()
+
+			Written, Callbacks = set(), []
+
+			for Function, args, Callback in Batch:
+				if Callback:
+					Callbacks.append(Callback)
+
+				try:
+					if f := Function(self, *args):
+						Written.add(f)
+				except:
+					print(traceback.format_exc())
+					print(f'Failed to write to the event log at {GetTime()}')
+
+			for f in Written:
+				try:
+					f.flush()
+					os.fsync(f.fileno())
+				except (OSError, ValueError):
+					pass
+
+			for Callback in Callbacks:
+				Callback()
@@ -1,176 +1,440 @@
 """Class for encoding order of gameplay, in coordination with the client script."""
 
-from random import shuffle
-from itertools import chain, cycle
+from random import Random
+from time import time
+from collections import defaultdict
 
-from Card import Card
+import Rules
+
+from Card import Cards, CardsByID
 from ClientClasses import *
 from Player import Player
+from Bots import ChooseBid, ChooseCard, LowestCard
+
 
-from os import environ
-environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
-from pygame.time import delay
+class TableClosed(Exception):
+	"""Raised in the thread playing the game if a player leaves the table, since the game can't continue without them."""
 
 
 class Game(object):
 	"""Class for encoding order of gameplay, in coordination with the client script."""
 
-	__slots__ = 'StartCardPositions', 'CardPositions', 'RepeatGame', 'Attributes', 'GameAttributes', 'Triggers', \
-	            'StartPlay'
+	__slots__ = 'RepeatGame', 'Attributes', 'GameAttributes', 'Triggers', \
+	            'StartPlay', 'Closed', 'BotCardNumber', 'Stage', 'NextStage', 'ResumeAt', \
+	            'Timeouts', 'Deadline', 'Fast', 'Barrier', 'Now', 'Seed', 'Started', 'Results'
 
-	def __init__(self, PlayerNumber):
-		self.StartCardPositions = [i for i in range(PlayerNumber)]
-		self.CardPositions = self.StartCardPositions
+	def __init__(self, PlayerNumber, BotCardNumber=0, Timeouts=None, Fast=False, Seed=None):
 		self.StartPlay = False
 		self.RepeatGame = True
+		self.Closed = False
 		self.Attributes = AttributeTracker(True, PlayerNumber)
 		self.Triggers = Triggers()
+		self.Stage = 'StartGame'
+		self.NextStage = ''
+		self.ResumeAt = 0
+
+		# Seconds that players have to bid ('Bid'), play a card ('Play') or finish an animation ('Ack'), if limited.
+		self.Timeouts = Timeouts or {}
+		self.Deadline = 0
+
+		# In fast mode, the game only waits for the players when they have a decision to make:
+		# clients are expected to skip their animations, or to catch up using the timestamps in self.Triggers.
+		self.Fast = Fast
+		self.Barrier = ''
+
+		# The game never looks at the clock or the global random number generator itself...
+		# ...so that, from the same starting state, the same commands at the same times always have the same result.
+		# Every round is dealt from a seed derived from self.Seed (see Rules.RoundSeed).
+		self.Now = time()
+		self.Seed = Rules.NewSeed() if Seed is None else Seed
+
+		# When the current game started, and the results of the rounds and games finished since the table last looked.
+		self.Started = self.Now
+		self.Results = []
+
+		# How many cards a game starts with, if a bot is the player who has to decide.
+		self.BotCardNumber = BotCardNumber or min(13, self.Attributes.Tournament['MaxCardNumber'])
+
+	@property
+	def Players(self):
+		"""The players seated at this game, in order of playerindex"""
+
+		return self.Attributes.Tournament['gameplayers']
+
+	# A few functions to be called on behalf of the clients (or the bots).
+
+	def __getstate__(self):
+		# (The time and the results are left out, so that the pickled game only changes when the game itself does.)
+		return {name: getattr(self, name) for name in self.__slots__ if name not in ('Now', 'Results') and hasattr(self, name)}
+
+	def __setstate__(self, State):
+		for name, value in State.items():
+			setattr(self, name, value)
+
+		self.Now = time()
+		self.Results = []
+
+	def AddPlayer(self, playerindex=None):
+		"""Seat a new player in the given position at the table (or in the lowest free position)"""
+
+		TakenIndexes = {player.playerindex for player in self.Players}
+
+		if playerindex is None:
+			playerindex = next(i for i in range(self.Attributes.Tournament['PlayerNumber']) if i not in TakenIndexes)
 
-	# A few functions to be accessed by the threaded-client function.
+		player = Player(playerindex)
+		self.Players.insert(sum(1 for i in TakenIndexes if i < playerindex), player)
+		return player
 
-	@staticmethod
-	def AddPlayerName(name, playerindex):
-		Player.AllPlayers[playerindex].AddName(name)
+	def AddBot(self, playerindex=None):
+		return self.AddPlayer(playerindex).BecomeBot()
+
+	def BotsBid(self):
+		for player in self.Players:
+			if player.Bot and player.Hand and player.Bid == -1:
+				self.PlayerMakesBid(player.playerindex, ChooseBid(player, self.Attributes.Round['trumpsuit']))
+
+	def BotPlays(self, player):
+		card = ChooseCard(player, self.Attributes.Trick['PlayedCards'], self.Attributes.Round['trumpsuit'])
+		self.ExecutePlay(card.ID, player.playerindex)
+
+	def RemovePlayer(self, player, EndGame=True):
+		self.Players.remove(player)
+
+		if EndGame:
+			self.Close()
+
+	def Close(self):
+		self.Closed = True
+
+	def CheckOpen(self):
+		if self.Closed:
+			raise TableClosed('A player has left the table.')
+
+	def AddPlayerName(self, name, playerindex):
+		self.Players[playerindex].AddName(name)
 
 	def TimeToStart(self):
 		self.StartPlay = True
 
-	@staticmethod
-	def PlayerActionCompleted(playerindex):
-		Player.AllPlayers[playerindex].ActionComplete = True
+	def PlayerActionCompleted(self, playerindex):
+		self.Players[playerindex].ActionComplete = True
 
 	def SetCardNumber(self, number):
 		self.Attributes.Game['StartCardNumber'] = int(number)
 
 	def PlayerMakesBid(self, playerindex, bid):
-		Player.AllPlayers[playerindex].MakeBid(int(bid))
+		self.Players[playerindex].MakeBid(int(bid))
 		self.Triggers.Surfaces['CurrentBoard'] += 1
 
 	def ExecutePlay(self, cardID, playerindex):
-		player = Player.AllPlayers[playerindex]
-		card = next(card for card in player.Hand if card.ID == cardID)
+		"""Play a card for a player, unless it isn't their turn or they can't play that card (then nothing changes)"""
+
+		Trick, PlayedCards = self.Attributes.Trick, self.Attributes.Trick['PlayedCards']
+		player, card = self.Players[playerindex], CardsByID.get(cardID) if isinstance(cardID, str) else None
+
+		if not (
+				self.Stage == 'CardPlayed'
+				and Trick['WhoseTurnPlayerIndex'] == playerindex
+				and len(PlayedCards) == (playerindex - Trick['FirstPlayerIndex']) % self.Attributes.Tournament['PlayerNumber']
+				and card
+				and player.Holds(card)
+				and Rules.FollowsSuit(card.Index, PlayedCards[0].Index // 13 if PlayedCards else -1, player.SuitCounts)
+		):
+			return False
+
 		player.PlayCard(card, self.Attributes.Round['trumpsuit'])
-		card.SetPos(self.CardPositions[len(self.Attributes.Trick['PlayedCards'])])
-		self.Attributes.Trick['PlayedCards'].append(card)
+		PlayedCards.append(card)
 		self.Triggers.Surfaces['CurrentBoard'] += 1
+		return True
 
 	def RepeatQuestionAnswer(self):
 		self.RepeatGame = True
 
 	# The remaining functions relate to the order of gameplay.
+	# The game is a state machine: self.Stage names the method that moves the game on from where it is now.
+	# Advance() runs stages until the game has to wait for the players, so a single thread can play many games.
+	# Only one thread (the table's writer) ever calls any of these functions, or the ones above, for a given game.
 
-	def WaitForPlayers(self, attribute):
-		self.Triggers.Events[attribute] += 1
+	def Advance(self, Now):
+		"""
 
-		while any(not player.ActionComplete for player in Player.AllPlayers):
-			delay(60)
+		Move the game on as far as it can go without waiting for anything, as of the time Now.
+		Returns None if the game is waiting for the players, or the number of seconds until it should be advanced again.
+		Raises TableClosed if the game cannot continue.
 
-		Player.AllPlayers = [player.NextStage() for player in Player.AllPlayers]
+		"""
 
-	def PlayGame(self):
-		# Wait until the opening sequence is complete
-		self.WaitForPlayers('GameInitialisation')
+		self.Now = Now
 
-		WhichRound = range(1, (self.Attributes.Game['StartCardNumber'] + 1))
-		HowManyCards = range(self.Attributes.Game['StartCardNumber'], 0, -1)
-		WhoLeads = cycle(Player.AllPlayers)
+		while True:
+			self.CheckOpen()
 
-		for roundnumber, cardnumber, RoundLeader in zip(WhichRound, HowManyCards, WhoLeads):
-			self.PlayRound(roundnumber, cardnumber, RoundLeader)
+			if (Wait := getattr(self, self.Stage)()) is not True:
+				return Wait
 
-		self.Attributes.Game['MaxPoints'] = max(player.Points for player in Player.AllPlayers)
+	def StartTimer(self, Kind):
+		self.Deadline = (self.Now + Timeout) if (Timeout := self.Timeouts.get(Kind)) else 0
 
-		self.Attributes.Game['Winners'] = [
-			player for player in Player.AllPlayers
-			if player.Points == self.Attributes.Game['MaxPoints']
-		]
+	def TimeLeft(self):
+		"""None if there's no time limit on the current stage, otherwise the seconds left until it runs out"""
 
-		for player in self.Attributes.Game['Winners']:
-			player.GamesWon += 1
+		return max(0, self.Deadline - self.Now) if self.Deadline else None
 
-		self.Triggers.Surfaces['Scoreboard'] += 1
+	def WaitForPlayers(self, attribute, NextStage):
+		self.Triggers.Events[attribute] += 1
+		self.Triggers.Timestamps[attribute] = self.Now
+		self.Barrier = attribute
+		self.Stage, self.NextStage = 'PlayersReady', NextStage
+		self.StartTimer('Bid' if any((player.Hand and player.Bid == -1) for player in self.Players) else 'Ack')
+		return True
 
-		# Wait until all players have finished announcing the game winners.
-		self.WaitForPlayers('WinnersAnnounced')
+	def PlayerReady(self, player):
+		if player.Bot:
+			return True
 
-		if self.Attributes.Tournament['GamesPlayed']:
-			self.Attributes.Tournament['MaxGamesWon'] = max(player.GamesWon for player in Player.AllPlayers)
+		if not self.Fast:
+			return player.ActionComplete
 
-			self.Attributes.Tournament['TournamentLeaders'] = [
-				player for player in Player.AllPlayers
-				if player.GamesWon == self.Attributes.Tournament['MaxGamesWon']
-			]
+		# In fast mode, the only decisions that hold up the game are the starting card number and the bids.
+		if self.Barrier == 'GameInitialisation':
+			return self.StartPlay
 
-			self.Triggers.Events['TournamentLeaders'] += 1
+		return player.Bid != -1 if self.Barrier == 'CardsDealt' else True
 
-		self.RepeatGame = False
+	def PlayersReady(self):
+		# (Bots bid as soon as they can: this also covers a bot taking over from a human who left before bidding.)
+		self.BotsBid()
 
-		while not self.RepeatGame:
-			delay(1)
+		if not all(self.PlayerReady(player) for player in self.Players):
+			if TimeLeft := self.TimeLeft():
+				return TimeLeft
 
-		self.NewGameReset()
+			if TimeLeft is None:
+				return None
 
-		# Wait until all players have logged their new playerindex.
-		self.WaitForPlayers('NewGameReset')
+			# Time's up: anyone who hasn't bid yet bids 0, and anyone still finishing an animation is skipped.
+			if not self.Attributes.Game['StartCardNumber']:
+				self.SetCardNumber(self.BotCardNumber)
+				self.TimeToStart()
+
+			for player in self.Players:
+				if player.Hand and player.Bid == -1:
+					self.PlayerMakesBid(player.playerindex, 0)
+				else:
+					player.ActionComplete = True
+
+		self.Players[:] = [player.NextStage() for player in self.Players]
+		self.Stage = self.NextStage
+		return True
+
+	def Pause(self, Seconds, NextStage):
+		self.ResumeAt = self.Now + Seconds
+		self.Stage, self.NextStage = 'PauseOver', NextStage
+		return Seconds
 
-		self.PlayGame()
+	def PauseOver(self):
+		if (Remaining := self.ResumeAt - self.Now) > 0:
+			return Remaining
 
-	def PlayRound(self, roundnumber, cardnumber, RoundLeader):
-		self.Attributes.Round['CardNumberThisRound'] = cardnumber
-		self.Attributes.Round['RoundNumber'] = roundnumber
+		self.Stage = self.NextStage
+		return True
+
+	def StartGame(self):
+		self.Started = self.Now
+
+		# If a bot has to decide how many cards the game starts with, it doesn't need to wait for anyone.
+		if self.Players[0].Bot and not self.Attributes.Game['StartCardNumber']:
+			self.SetCardNumber(self.BotCardNumber)
+			self.TimeToStart()
+
+		# Wait until the opening sequence is complete
+		return self.WaitForPlayers('GameInitialisation', 'StartRound')
+
+	def StartRound(self):
+		roundnumber = self.Attributes.Round['RoundNumber']
+		RoundLeader = self.Players[(roundnumber - 1) % len(self.Players)]
+
+		self.Attributes.Round['CardNumberThisRound'] = self.Attributes.Game['StartCardNumber'] + 1 - roundnumber
 		self.Attributes.Round['RoundLeader'] = RoundLeader
 		RoundLeader.RoundLeader = True
 		self.Triggers.Surfaces['Scoreboard'] += 1
 
-		self.WaitForPlayers('RoundStart')
+		return self.WaitForPlayers('RoundStart', 'ShufflePack')
 
+	def ShufflePack(self):
 		# the trumpcard is set as part of this function call.
 		self.NewPack()
-		self.WaitForPlayers('NewPack')
+		return self.WaitForPlayers('NewPack', 'DealCards')
 
-		# Deal cards
+	def DealCards(self):
 		Pack, trumsuit = self.Attributes.Round['PackOfCards'], self.Attributes.Round['trumpsuit']
+		cardnumber = self.Attributes.Round['CardNumberThisRound']
 
-		Player.AllPlayers = [
+		Holders = self.Attributes.Round['Holders'] = bytearray(52)
+
+		for player in self.Players:
 			player.ReceiveCards([Pack.pop() for i in range(cardnumber)], trumsuit)
-			for player in Player.AllPlayers
-		]
+
+			for card in player.Hand:
+				Holders[card.Index] = player.playerindex
 
 		self.Triggers.Surfaces['TrumpCard'] += 1
 		self.Triggers.Surfaces['CurrentBoard'] += 1
-		self.WaitForPlayers('CardsDealt')
+		return self.WaitForPlayers('CardsDealt', 'FirstTrick')
 
-		FirstPlayer = RoundLeader
+	def FirstTrick(self):
+		RoundLeader = self.Attributes.Round['RoundLeader']
 		RoundLeader.RoundLeader = False
+		self.TrickStart(1, RoundLeader)
+		return self.WaitForPlayers('TrickStart', 'NextTurn')
+
+	def NextTurn(self):
+		PlayerNumber = self.Attributes.Tournament['PlayerNumber']
+
+		if (CardsPlayed := len(self.Attributes.Trick['PlayedCards'])) == PlayerNumber:
+			self.Stage = 'TrickEnd'
+			return True
+
+		self.Attributes.Trick['WhoseTurnPlayerIndex'] = (self.Attributes.Trick['FirstPlayerIndex'] + CardsPlayed) % PlayerNumber
+		self.Triggers.Surfaces['CurrentBoard'] += 1
+		self.Stage = 'CardPlayed'
+		self.StartTimer('Play')
+		return True
+
+	def CardPlayed(self):
+		PlayerNumber = self.Attributes.Tournament['PlayerNumber']
+		PlayedCards = self.Attributes.Trick['PlayedCards']
+		i = self.Attributes.Trick['WhoseTurnPlayerIndex']
+
+		# How many cards will have been played once it's the next player's turn
+		Target = ((i - self.Attributes.Trick['FirstPlayerIndex']) % PlayerNumber) + 1
 
-		for i in range(cardnumber):
-			FirstPlayerIndex = self.TrickStart(i + 1, FirstPlayer)
-			self.TrickMiddle(FirstPlayerIndex)
-			FirstPlayer = self.TrickEnd(self.Attributes.Trick['PlayedCards'])
+		if len(PlayedCards) < Target and (player := self.Players[i]).Bot:
+			self.BotPlays(player)
 
-		self.WaitForPlayers('RoundEnd')
+		if len(PlayedCards) < Target:
+			if (TimeLeft := self.TimeLeft()) is None or TimeLeft:
+				return TimeLeft
 
-		Player.AllPlayers = [player.ReceivePoints() for player in Player.AllPlayers]
+			# Time's up: the player's lowest legal card is played for them.
+			card = LowestCard(player.Hand, PlayedCards, self.Attributes.Round['trumpsuit'])
+			self.ExecutePlay(card.ID, i)
 
+		self.Stage = 'NextTurn'
+		return True
+
+	def TrickEnd(self):
+		PlayedCards = self.Attributes.Trick['PlayedCards']
+		self.Attributes.Trick['WhoseTurnPlayerIndex'] = -1
+		self.Attributes.Trick['TrickInProgress'] = False
+		TrumpSuit = Rules.Suits.index(self.Attributes.Round['trumpsuit'])
+		Winner = Rules.TrickWinner([card.Index for card in PlayedCards], TrumpSuit)
+		self.Attributes.Trick['Winner'] = self.Players[self.Attributes.Round['Holders'][PlayedCards[Winner].Index]]
+
+		self.Attributes.Trick['Winner'].WinsTrick()
+		self.Attributes.Trick['FirstPlayerIndex'] = 0
+
+		# Leave the finished trick on the board for a moment.
+		return self.Pause((0 if self.Fast else 0.5), 'ClearTrick')
+
+	def ClearTrick(self):
+		self.Attributes.Trick['PlayedCards'].clear()
+		self.Triggers.Surfaces['CurrentBoard'] += 1
+		return self.WaitForPlayers('TrickEnd', 'AfterTrick')
+
+	def AfterTrick(self):
+		if (TrickNumber := self.Attributes.Trick['TrickNumber']) < self.Attributes.Round['CardNumberThisRound']:
+			self.TrickStart(TrickNumber + 1, self.Attributes.Trick['Winner'])
+			return self.WaitForPlayers('TrickStart', 'NextTurn')
+
+		return self.WaitForPlayers('RoundEnd', 'AwardPoints')
+
+	def AwardPoints(self):
+		self.Players[:] = [player.ReceivePoints() for player in self.Players]
 		self.Triggers.Surfaces['Scoreboard'] += 1
-		self.WaitForPlayers('PointsAwarded')
+		return self.WaitForPlayers('PointsAwarded', 'RoundEnd')
 
-		Player.AllPlayers = [player.EndOfRound() for player in Player.AllPlayers]
+	def RoundEnd(self):
+		Round = self.Attributes.Round
+
+		self.Results.append(('Round', {
+			'Started': self.Started, 'Finished': self.Now, 'RoundNumber': Round['RoundNumber'],
+			'CardNumber': Round['CardNumberThisRound'], 'TrumpSuit': Round['trumpsuit'], 'Seed': Round['Seed'],
+			'Players': [(player.playerindex, str(player.name), player.Bot, player.Bid, player.Tricks,
+			             player.PointsThisRound, player.Points) for player in self.Players]
+		}))
+
+		self.Players[:] = [player.EndOfRound() for player in self.Players]
 
 		self.Attributes.Round['TrumpCard'] = None
 		self.Attributes.Round['trumpsuit'] = ''
+		self.Stage = 'GameEnd'
 
 		if self.Attributes.Round['RoundNumber'] != self.Attributes.Game['StartCardNumber']:
 			self.Attributes.Round['RoundNumber'] += 1
 			self.Attributes.Round['CardNumberThisRound'] -= 1
 			self.Attributes.Trick['TrickNumber'] = 1
+			self.Stage = 'StartRound'
 
 		self.Triggers.Surfaces['CurrentBoard'] += 1
 		self.Triggers.Surfaces['Scoreboard'] += 1
+		return True
+
+	def GameEnd(self):
+		self.Attributes.Game['MaxPoints'] = max(player.Points for player in self.Players)
+
+		self.Attributes.Game['Winners'] = [
+			player for player in self.Players
+			if player.Points == self.Attributes.Game['MaxPoints']
+		]
+
+		for player in self.Attributes.Game['Winners']:
+			player.GamesWon += 1
+
+		self.Results.append(('Game', {
+			'Started': self.Started, 'Finished': self.Now, 'CardNumber': self.Attributes.Game['StartCardNumber'],
+			'Players': [(player.playerindex, str(player.name), player.Bot, player.Points,
+			             player in self.Attributes.Game['Winners'], player.GamesWon) for player in self.Players]
+		}))
+
+		self.Triggers.Surfaces['Scoreboard'] += 1
+
+		# Wait until all players have finished announcing the game winners.
+		return self.WaitForPlayers('WinnersAnnounced', 'TournamentLeaders')
+
+	def TournamentLeaders(self):
+		if self.Attributes.Tournament['GamesPlayed']:
+			self.Attributes.Tournament['MaxGamesWon'] = max(player.GamesWon for player in self.Players)
+
+			self.Attributes.Tournament['TournamentLeaders'] = [
+				player for player in self.Players
+				if player.GamesWon == self.Attributes.Tournament['MaxGamesWon']
+			]
+
+			self.Triggers.Events['TournamentLeaders'] += 1
+
+		self.RepeatGame = False
+		self.Stage = 'Rematch'
+		return True
+
+	def Rematch(self):
+		if not self.RepeatGame:
+			# Nobody is left to ask for a rematch.
+			if all(player.Bot for player in self.Players):
+				raise TableClosed('Only bots are left at the table.')
+
+			return None
+
+		self.NewGameReset()
+
+		# Wait until all players have logged their new playerindex.
+		return self.WaitForPlayers('NewGameReset', 'StartGame')
 
 	def NewPack(self):
-		PackOfCards = [Card(value, suit) for value in range(2, 15) for suit in ('D', 'S', 'C', 'H')]
-		shuffle(PackOfCards)
+		Round = self.Attributes.Round
+		Round['Seed'] = Rules.RoundSeed(self.Seed, self.Attributes.Tournament['GamesPlayed'], Round['RoundNumber'])
+		PackOfCards = [Cards[card] for card in Rules.NewPack(Random(Round['Seed']))]
 		TrumpCard = PackOfCards.pop()
 
 		self.Attributes.Round['trumpsuit'] = TrumpCard.ActualSuit
@@ -184,49 +448,45 @@ class Game(object):
 
 		FirstPlayerIndex = FirstPlayer.playerindex
 		self.Attributes.Trick['FirstPlayerIndex'] = FirstPlayerIndex
-
-		self.CardPositions = (self.StartCardPositions[FirstPlayerIndex:]
-		                      + self.StartCardPositions[:FirstPlayerIndex])
 		return FirstPlayerIndex
 
-	def TrickMiddle(self, FirstPlayerIndex):
-		self.WaitForPlayers('TrickStart')
+	def NewGameReset(self):
+		self.Attributes.Game['StartCardNumber'] = 0
+		self.Attributes.Round['RoundNumber'] = 1
 
-		for i in chain(range(FirstPlayerIndex, self.Attributes.Tournament['PlayerNumber']), range(FirstPlayerIndex)):
+		self.Players[:] = self.Players[1:] + self.Players[:1]
+		self.Players[:] = [player.ResetPlayer(i) for i, player in enumerate(self.Players)]
+		self.Attributes.Tournament['GamesPlayed'] += 1
+		self.Triggers.Surfaces['Scoreboard'] += 1
+		self.StartPlay = False
 
-			currentnumber = len(self.Attributes.Trick['PlayedCards'])
-			self.Attributes.Trick['WhoseTurnPlayerIndex'] = i
-			self.Triggers.Surfaces['CurrentBoard'] += 1
 
-			while len(self.Attributes.Trick['PlayedCards']) == currentnumber:
-				delay(60)
+# How the game is changed by each kind of message from a client.
+# Default operation is if the client is telling us which card they want to play
+Operations = defaultdict(lambda: lambda game, Info: game.ExecutePlay(Info['Message'], Info['playerindex']))
 
-	def TrickEnd(self, PlayedCards):
-		self.Attributes.Trick['WhoseTurnPlayerIndex'] = -1
-		self.Attributes.Trick['TrickInProgress'] = False
-		self.Attributes.Trick['Winner'] = (
-			max((card.DetermineWinValue(PlayedCards[0].ActualSuit, self.Attributes.Round['trumpsuit'])
-			     for card in PlayedCards), key=Card.GetWinValue)).PlayedBy
+Operations.update({
+	# if the client is just asking for an updated copy of the game
+	'@G': lambda game, Info: None,
 
-		self.Attributes.Trick['Winner'].WinsTrick()
-		self.Attributes.Trick['FirstPlayerIndex'] = 0
+	# if the client is sending the name of that player
+	'player': lambda game, Info: game.AddPlayerName(Info['Message'], Info['playerindex']),
 
-		delay(500)
+	# if the client is telling us how many cards the game should start with
+	'CardNumber': lambda game, Info: game.SetCardNumber(Info['Message']),
 
-		PlayedCards.clear()
-		self.Triggers.Surfaces['CurrentBoard'] += 1
+	# if the client is telling us the players are ready to start the game
+	'@S': lambda game, Info: game.TimeToStart(),
 
-		self.WaitForPlayers('TrickEnd')
-		return self.Attributes.Trick['Winner']
+	# if the client is telling us how many tricks they are going to bid in this round.
+	'Bid': lambda game, Info: game.PlayerMakesBid(Info['playerindex'], Info['Message']),
 
-	def NewGameReset(self):
-		self.Attributes.Game['StartCardNumber'] = 0
-		self.Attributes.Round['RoundNumber'] = 1
+	# If the client is telling us whether they want an instant rematch after the game has ended.
+	'@1': lambda game, Info: game.RepeatQuestionAnswer(),
 
-		Player.AllPlayers = Player.AllPlayers[1:] + Player.AllPlayers[:1]
-		Player.AllPlayers = [player.ResetPlayer(Player.AllPlayers.index(player)) for player in Player.AllPlayers]
+	# If the client is saying they don't want a repeat game.
+	'@T': lambda game, Info: 'Terminate',
 
-		self.Attributes.Tournament['gameplayers'] = Player.AllPlayers
-		self.Attributes.Tournament['GamesPlayed'] += 1
-		self.Triggers.Surfaces['Scoreboard'] += 1
-		self.StartPlay = False
+	# If the client is telling us they've completed an animation sequence.
+	'@A': lambda game, Info: game.PlayerActionCompleted(Info['playerindex'])
+})
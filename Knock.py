@@ -11,7 +11,7 @@ from PasswordChecker import *
 from Player import Player
 from ClientClasses import *
 
-from time import time
+from time import time, sleep
 from PIL import Image
 from ipaddress import ip_address
 from os import chdir, environ, path
@@ -40,7 +40,7 @@ class Window(object):
 	__slots__ = 'GameUpdatesNeeded', 'lock', 'Triggers', 'OperationsDict', 'fonts', 'gameplayers', 'Attributes', \
 	            'player', 'ToBlit', 'InputText', 'Client', 'game', 'Window', 'CardImages', 'MessagesFromServer', \
 	            'Surfaces', 'ScoreboardAttributes', 'CoverRects', 'clock', 'PlayerTextPositions', 'name', 'Dimensions', \
-	            'Errors', 'PlayStarted'
+	            'Errors', 'PlayStarted', 'CardRects'
 
 	DefaultFont = 'Times New Roman'
 
@@ -72,6 +72,9 @@ class Window(object):
 		self.gameplayers = []
 		self.ToBlit = []
 		self.CoverRects = {'Hand': []}
+
+		# Where each card is drawn, and where it can be clicked, by card index.
+		self.CardRects = {}
 		self.Attributes = AttributeTracker()
 
 		WindowX, WindowY = WindowDimensions
@@ -202,8 +205,20 @@ class Window(object):
 
 		while True:
 			try:
-				self.Client = Network(IP, Port, password=password)
+				self.Client = Network(IP, Port, password=password, ResumeToken=LoadResumeToken(IP, Port))
+
+				# The server may turn us away if it's too busy, telling us how long to wait before trying again.
+				if RetryAfter := self.Client.InfoDict.get('RetryAfter'):
+					print(f"The server couldn't accept any more players ({self.Client.InfoDict['Reason']}).")
+					print(f'Another attempt to connect will be made in {RetryAfter} seconds.')
+					sleep(RetryAfter)
+					continue
+
 				self.game, self.player = self.Client.InfoDict['game'], self.Client.InfoDict['player']
+
+				if Token := self.Client.InfoDict.get('ResumeToken'):
+					SaveResumeToken(IP, Port, Token)
+
 				break
 			except (TypeError, ConnectionRefusedError) as e:
 				if str(e) in ErrorTuple:
@@ -340,6 +355,12 @@ class Window(object):
 			if self.GameUpdatesNeeded:
 				self.GetGame(CheckForExit=False)
 
+	@property
+	def FastMode(self):
+		"""If the server is running the game in fast mode, it won't wait for our animations, so we skip them."""
+
+		return getattr(self.game, 'Fast', False)
+
 	def Fill(self, SurfaceObject, colour):
 		if isinstance(SurfaceObject, str):
 			SurfaceObject = self.Surfaces[SurfaceObject]
@@ -347,12 +368,12 @@ class Window(object):
 		SurfaceObject.fill(self.Colours[colour])
 		return SurfaceObject
 
-	def Updaterects(self, List, Surface):
+	def Updaterects(self, List, Surface, Positions):
 		"""Helper method for the below method"""
 
-		for card in List:
-			card.rect = self.Surfaces[Surface].RectList[card.PosIndex]
-			card.colliderect = card.rect.move(*self.Surfaces[Surface].pos)
+		for card, Position in zip(List, Positions):
+			rect = self.Surfaces[Surface].RectList[Position]
+			self.CardRects[card.Index] = rect, rect.move(*self.Surfaces[Surface].pos)
 
 	def UpdateGameAttributes(self):
 		"""
@@ -365,11 +386,13 @@ class Window(object):
 		self.gameplayers = self.game.Attributes.Tournament['gameplayers']
 		self.player = next(player for player in self.gameplayers if player.name == self.name)
 
-		self.Updaterects(self.player.Hand, 'Hand')
-		self.Updaterects(self.game.Attributes.Trick['PlayedCards'], 'Board')
+		# Cards in the hand are drawn in order, and each card in the trick in front of the player who played it.
+		PlayedCards, Holders = self.game.Attributes.Trick['PlayedCards'], self.game.Attributes.Round['Holders']
+		self.Updaterects(self.player.Hand, 'Hand', range(len(self.player.Hand)))
+		self.Updaterects(PlayedCards, 'Board', [Holders[card.Index] for card in PlayedCards])
 
 		if TrumpCard := self.game.Attributes.Round['TrumpCard']:
-			self.Updaterects((TrumpCard,), 'TrumpCard')
+			self.Updaterects((TrumpCard,), 'TrumpCard', (-1,))
 
 		self.Attributes = self.game.Attributes
 		self.Triggers['Server'] = self.game.Triggers
@@ -454,7 +477,9 @@ class Window(object):
 
 			elif Dict['TrickInProgress'] and Dict['WhoseTurnPlayerIndex'] == self.player.playerindex:
 				for card in self.player.Hand:
-					if (Result := card.Click(self.game, MousePos)) == 'Not clicked':
+					colliderect = self.CardRects.get(card.Index, (None, None))[1]
+
+					if (Result := card.Click(self.game, MousePos, colliderect)) == 'Not clicked':
 						pass
 					elif Result:
 						self.Errors['ThisPass'].append(Result)
@@ -547,6 +572,9 @@ class Window(object):
 
 		y = 0 if FunctionOfGame else (pg.time.get_ticks() + TimeToWait if not y else y)
 
+		if self.FastMode and not (function or FunctionOfGame):
+			y = pg.time.get_ticks()
+
 		if function and not FunctionOfGame:
 			while function(pg.time.get_ticks(), y):
 				self.WaitHelperFunction(FunctionOfGame, ClicksNeeded, TypingNeeded, Bidding, UpdateWindow, OutsideRound)
@@ -581,7 +609,7 @@ class Window(object):
 		elif Surface2 in self.Surfaces:
 			Surface1.blit(*self.Surfaces[Surface2].surfandpos)
 		else:
-			Surface1.blit(self.CardImages[Surface2.ID], Surface2.rect)
+			Surface1.blit(self.CardImages[Surface2.ID], self.CardRects[Surface2.Index][0])
 
 		return Surface1
 
@@ -597,6 +625,9 @@ class Window(object):
 
 		RenderedSteps = [self.fonts['Title'].render(step, False, (0, 0, 0)) for step in accumulate(text)]
 
+		if self.FastMode:
+			RenderedSteps = RenderedSteps[-1:]
+
 		for step in RenderedSteps:
 			self.Surfaces['Game'].blit(step, TopLeft)
 			if step != RenderedSteps[-1]:
@@ -744,7 +775,9 @@ class Window(object):
 		LineSize = self.fonts['Normal'].linesize
 		players = self.gameplayers
 
-		BoardSurfaceBlits = [(self.CardImages[card.ID], card.rect) for card in self.Attributes.Trick['PlayedCards']]
+		BoardSurfaceBlits = [
+			(self.CardImages[card.ID], self.CardRects[card.Index][0]) for card in self.Attributes.Trick['PlayedCards']
+		]
 
 		for player in players:
 			BaseX, BaseY = Pos = self.PlayerTextPositions[player.playerindex]
@@ -775,7 +808,7 @@ class Window(object):
 		TrumpCard = self.Attributes.Round['TrumpCard']
 		self.Fill('TrumpCard', 'Maroon')
 		Pos = (self.Surfaces['TrumpCard'].midpoint, (self.fonts['Normal'].linesize // 2))
-		Trump = (self.CardImages[TrumpCard.ID], TrumpCard.rect)
+		Trump = (self.CardImages[TrumpCard.ID], self.CardRects[TrumpCard.Index][0])
 		self.Surfaces['TrumpCard'].blits((self.GetText('Trumpcard', colour=BoardTextColour, pos=Pos), Trump))
 		self.Triggers['Client'].Surfaces['TrumpCard'] = self.Triggers['Server'].Surfaces['TrumpCard']
 
@@ -979,7 +1012,7 @@ class Window(object):
 			colour1, colour2 = [colour1], [colour2]
 
 		StartTime = PreviousTime = pg.time.get_ticks()
-		EndTime = StartTime + 1000
+		EndTime = StartTime + (0 if self.FastMode else 1000)
 		CurrentColour = colour1
 		Range = range(1) if OpacityTransition else range(3)
 
@@ -1237,7 +1270,9 @@ class Window(object):
 		self.PlayStarted = False
 		self.Wait(TimeToWait=500)
 		self.Fade('LightGrey', 'Maroon', TextFade=False, ScoreboardFade=True)
-		self.FireworksDisplay()
+
+		if not self.FastMode:
+			self.FireworksDisplay()
 		self.Wait(TimeToWait=1000, UpdateWindow=False, OutsideRound=True)
 		self.Fill('Game', 'Maroon')
 
@@ -2,59 +2,28 @@
 
 """This script must be run by exactly one machine for a game to take place."""
 
-import traceback
+import sys, signal, traceback
 
 from Network import *
 from PasswordChecker import *
-from Game import Game
-from Player import Player
+from ServerConfig import ServerConfig
+from Table import Table, Lobby
+from Admission import RateLimiter
+from Results import ResultsStore
+from Accounting import MeteredSocket, CPUTimer
+from Upgrade import Handover, TakeOver, Acknowledge
 
 from pyinputplus import inputInt, inputMenu, inputCustom
-from collections import defaultdict
-
-from os import environ
-environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
-import pygame as pg
 
 
 print('Welcome to Knock!')
 
-# Default operation is if the client is telling us which card they want to play
-Operations = defaultdict(lambda: lambda game, Info: game.ExecutePlay(Info['Message'], Info['playerindex']))
-
-Operations.update({
-	# if the client is just asking for an updated copy of the game
-	'@G': lambda game, Info: None,
-
-	# if the client is sending the name of that player
-	'player': lambda game, Info: game.AddPlayerName(Info['Message'], Info['playerindex']),
-
-	# if the client is telling us how many cards the game should start with
-	'CardNumber': lambda game, Info: game.SetCardNumber(Info['Message']),
-
-	# if the client is telling us the players are ready to start the game
-	'@S': lambda game, Info: game.TimeToStart(),
-
-	# if the client is telling us how many tricks they are going to bid in this round.
-	'Bid': lambda game, Info: game.PlayerMakesBid(Info['playerindex'], Info['Message']),
-
-	# If the client is telling us whether they want an instant rematch after the game has ended.
-	'@1': lambda game, Info: game.RepeatQuestionAnswer(),
-
-	# If the client is saying they don't want a repeat game.
-	'@T': lambda game, Info: 'Terminate',
-
-	# If the client is telling us they've completed an animation sequence.
-	'@A': lambda game, Info: game.PlayerActionCompleted(Info['playerindex'])
-})
-
-
-def CommsWithClient(Server, player, conn, addr, Operations=Operations):
-	global game
 
+def CommsWithClient(Server, table, player, conn, addr, link=None):
+	# (Messages are sent and received through link, if given, so that the table can count the bytes.)
+	link = link or conn
 	Broken = False
-	playerindex = Player.AllPlayers.index(player)
-	data = Server.receive(conn)
+	data = Server.receive(link)
 
 	if not data:
 		Broken = True
@@ -64,93 +33,191 @@ def CommsWithClient(Server, player, conn, addr, Operations=Operations):
 		else:
 			MessageType, Message = data['MessageType'], data['Message']
 
-		Info = {'Message': Message,
-		        'playerindex': playerindex}
+		# Asking for an updated copy of the game doesn't need to wait for the table's writer.
+		if MessageType == '@G':
+			Result, snapshot = None, table.Snapshot
+		else:
+			Result, snapshot = table.Submit(table.ClientMessage, player, MessageType, Message, Reply=True)
 
-		if Operations[MessageType](game, Info) == 'Terminate':
+		if Result == 'Terminate':
 			Broken = True
 
 	if Broken:
 		print(f'Connection with {addr} was broken at {GetTime()}.\n')
+		table.Unseat(player, conn)
+		return False
 
-		try:
-			Player.AllPlayers.remove(player)
-			conn.shutdown(socket.SHUT_RDWR)
-			conn.close()
-		finally:
-			raise Exception('Connection was terminated.')
-
-	Server.send(game, conn=conn)
+	Server.send(snapshot.Payload, conn=link, pickled=True)
 	return True
 
 
-def ThreadedClient(Server, playerindex, conn, addr):
-	global game
-
-	# We want the whole server script to fail if a single thread goes down,
-	# since there's no point continuing a game if one of the players has left
-
-	player = Player(playerindex)
+def ThreadedClient(Server, table, player, conn, addr, Limiter=None, Handover=None, Welcome=True):
+	# If a single player leaves, the whole table is closed,
+	# since there's no point continuing a game if one of the players has left.
+	# This is the only place a client's connection is closed: anything else wanting it closed just shuts it down.
 
-	Server.send({'game': game, 'playerindex': playerindex}, conn=conn)
-	print(f'Game sent to client {addr} at {GetTime()}.\n')
+	link = MeteredSocket(conn, table.meter, player)
+	HandedOver = False
 
-	while True:
-		try:
-			if not CommsWithClient(Server, player, conn, addr):
+	try:
+		# (A connection handed over by another server process has already been welcomed.)
+		if Welcome:
+			Server.send(table.Submit(table.Welcome, player), conn=link, pickled=True)
+			print(f'Game sent to client {addr} at {GetTime()}.\n')
+
+		while True:
+			# If the server is being handed over, the connection is left alone for the new server to pick up.
+			if Handover and not Handover.Waiting(conn):
+				HandedOver = True
 				break
-		except:
-			print(traceback.format_exc())
-			print(f'Exception occurred at {GetTime()}')
-			break
 
+			if Limiter:
+				Limiter.Throttle()
+
+			with CPUTimer(table.meter.Message):
+				if not CommsWithClient(Server, table, player, conn, addr, link):
+					break
+	except OSError as e:
+		# (Most likely the table has closed, and shut the connection down while this thread was using it.)
+		print(f'Connection with {addr} was lost at {GetTime()}: {e}\n')
+		table.Unseat(player, conn)
+	except:
+		print(traceback.format_exc())
+		print(f'Exception occurred at {GetTime()}')
+		table.Unseat(player, conn)
+	finally:
+		if not HandedOver:
+			Server.CloseConnection(conn)
 
-PasswordChoices = [
-	"I want a new, randomly generated password for this game",
-	"I've already got a password for this game",
-	"I don't want a password for this game"
-]
-
-while True:
-	NumberOfPlayers = inputInt('How many players will be playing? ', min=2, max=6)
-	game = Game(NumberOfPlayers)
-	print()
 
-	if Choice := inputMenu(
-			choices=PasswordChoices, prompt='Select whether you want to set a password for this game:\n\n',
-			numbered=True, blank=True) == PasswordChoices[0]:
+def RunHeadless(Config):
+	"""Host Config.Tables tables without any prompts, reopening each table whenever its game ends."""
 
+	if Config.PasswordMode == 'generate':
 		password = GeneratePassword()
-		print(f'\nYour randomly generated password for this session is {password}')
-	elif Choice == PasswordChoices[1]:
-		password = inputCustom(PasswordInput, '\nPlease enter the password for this session: ')
+		print(f'Your randomly generated password for this session is {password}')
+	elif Config.PasswordMode == 'fixed':
+		password = Config.Password
+		PasswordInput(password)
 	else:
 		password = ''
 
-	ManuallyVerify = inputYesNo('\nDo you want to manually authorise each connection? '
-	                            '(If "no", new connections will be accepted automatically '
-	                            'if they have entered the correct password.) ', blank=True) == 'yes'
+	Listener, Inherited, OldServer = TakeOver(Config.UpgradeSocket) if Config.TakeOver else (None, (), None)
+	lobby = Lobby(Config, ThreadedClient, Inherited)
+	Server = Network(Config.Host, Config.Port, server=True, sock=Listener)
 
-	print('Initialising server...')
+	if Config.UpgradeSocket:
+		lobby.Handover = Handover(Config.UpgradeSocket)
+		Server.Interrupt = lobby.Handover.WakeRead
 
-	# The server will accept new connections until the expected number of players have connected to the server.
-	# Remember - this part of the code will fail if the server's network router does not have port forwarding set up.
-	# (Warning does not apply if you are playing within one local area network.)
+	lobby.Adopt(Server)
 
-	Server = Network('', YOUR_PORT_NUMBER_HERE, ManuallyVerify, ThreadedClient, True, NumberOfPlayers,
-	                 AccessToken=AccessToken, password=password)
+	def Shutdown(signum, frame):
+		print(f'Received signal {signum}; shutting down at {GetTime()}.')
+		lobby.Shutdown()
 
-	while len(Player.AllPlayers) < NumberOfPlayers or any(not player.name for player in Player.AllPlayers):
-		pg.time.delay(60)
+	for signum in (signal.SIGINT, signal.SIGTERM):
+		signal.signal(signum, Shutdown)
+
+	# 'kill -USR1 <pid>' prints what each table is costing the server.
+	if hasattr(signal, 'SIGUSR1'):
+		signal.signal(signal.SIGUSR1, lambda signum, frame: print(lobby.Report()))
+
+	if OldServer:
+		print(f'Took over {len(Inherited)} table(s) from the old server at {GetTime()}.\n')
+		Acknowledge(OldServer)
+
+	AcceptThread = Thread(
+		target=Server.AcceptConnections,
+		args=(lobby.Seat, 0, Config.AccessToken, password, False, lobby.Admit),
+		daemon=True
+	)
+
+	AcceptThread.start()
+
+	if lobby.Handover:
+		lobby.Handover.Serve(lobby, Server, AcceptThread)
+
+	lobby.Finished.wait()
+
+	# (The listening socket now belongs to the new server too, so it has to be left open.)
+	if lobby.HandedOver:
+		print(f'The new server has taken over; this one is shutting down at {GetTime()}.')
+		return 0
+
+	Server.StopListening()
+
+	if lobby.Store:
+		lobby.Store.Flush()
+
+	print(f'All tables have closed; the server is shutting down at {GetTime()}.')
+	return lobby.ExitStatus()
+
+
+def RunInteractively(Config):
+	"""The original mode of running the server: one table, with settings entered at the command line."""
+
+	PasswordChoices = [
+		"I want a new, randomly generated password for this game",
+		"I've already got a password for this game",
+		"I don't want a password for this game"
+	]
+
+	Store = ResultsStore(Config.ResultsDatabase) if Config.ResultsDatabase else None
+
+	while True:
+		NumberOfPlayers = Config.PlayerNumber or inputInt('How many players will be playing? ', min=2, max=6)
+		Port = Config.Port or inputInt('Which port should the server listen on? ', min=5001, max=65535)
+		table = Table(0, NumberOfPlayers, Config, Store=Store)
+		print()
+
+		if (Choice := inputMenu(
+				choices=PasswordChoices, prompt='Select whether you want to set a password for this game:\n\n',
+				numbered=True, blank=True)) == PasswordChoices[0]:
+
+			password = GeneratePassword()
+			print(f'\nYour randomly generated password for this session is {password}')
+		elif Choice == PasswordChoices[1]:
+			password = inputCustom(PasswordInput, '\nPlease enter the password for this session: ')
+		else:
+			password = ''
+
+		ManuallyVerify = Config.ManuallyVerify or inputYesNo(
+			'\nDo you want to manually authorise each connection? '
+			'(If "no", new connections will be accepted automatically '
+			'if they have entered the correct password.) ', blank=True) == 'yes'
+
+		print('Initialising server...')
+
+		# The server will accept new connections until the expected number of players have connected to the server.
+		# Remember - this part of the code will fail if the server's network router does not have port forwarding set up.
+		# (Warning does not apply if you are playing within one local area network.)
+
+		def SeatClient(Server, ConnectionNumber, conn, addr, Token):
+			ThreadedClient(Server, table, table.Seat(conn, addr), conn, addr, RateLimiter(Config.MaxMessageRate))
+
+		HumanSeats = NumberOfPlayers - len(table.game.Players)
+
+		GameOver = table.Play()
+
+		Server = Network(Config.Host, Port, ManuallyVerify, SeatClient, True, HumanSeats,
+		                 AccessToken=Config.AccessToken, password=password)
 
-	try:
-		game.PlayGame()
-	finally:
 		try:
-			Server.CloseDown()
-		except:
-			pass
+			GameOver.wait()
+
+			if Store:
+				Store.Flush()
+		finally:
+			try:
+				Server.CloseDown()
+			except:
+				pass
+
+		if inputYesNo('The server has closed down. Would you like to reinitialise and play again? ') == 'no':
+			return 0
+
 
-	if inputYesNo('The server has closed down. Would you like to reinitialise and play again? ') == 'no':
-		pg.quit()
-		quit()
+if __name__ == '__main__':
+	Config = ServerConfig.Load()
+	sys.exit(RunHeadless(Config) if Config.Headless else RunInteractively(Config))
@@ -1,67 +1,138 @@
 """
 
-Two classes that have to do with communications between the server and clients...
-...plus a one-line function for returning the current time in a fixed format.
+Two classes that have to do with communications between the server and clients.
+(GetTime, for returning the current time in a fixed format, lives in Clock, but can still be imported from here.)
 
 """
 
-import socket, pickle
+import socket, pickle, select
 
 from PasswordChecker import PasswordChecker
+from Clock import GetTime
 
 from threading import Thread
 from pyinputplus import inputYesNo
-from datetime import datetime
+from os import environ
+from traceback import format_exc
 
 
-AccessToken = ACCESS_TOKEN_IF_YOU_HAVE_ONE_FOR_IP_INFO
+# If you have an account with ipinfo.io, set this environment variable to your access token (see README).
+AccessToken = environ.get('KNOCK_ACCESS_TOKEN', '')
 
-
-def GetTime():
-	"""Function to get the time in a fixed format"""
-
-	return datetime.now().strftime("%H:%M:%S")
+# Straight after connecting (and sending the password, if there is one), a client sends the resume token...
+# ...that the server gave it for its seat last time, if it wants the seat back (see Table.Welcome), or dashes if not.
+ResumeTokenLength = 32
 
 
 class Network(object):
 	"""Class object for encoding communication protocols between the server and client."""
 
 	__slots__ = 'conn', 'ClientThreads', 'IP', 'port', 'addr', 'InfoDict', 'server', 'ManuallyVerify', 'cipher',\
-	            'PasswordChecker'
+	            'PasswordChecker', 'Listening', 'Interrupt'
 
 	def __init__(self, IP, port, ManuallyVerify=False, ThreadedFunction=None, server=False,
-	             NumberOfPlayers=0, AccessToken='', password=''):
+	             NumberOfPlayers=0, AccessToken='', password='', sock=None, ResumeToken=''):
 
 		self.server = server
-		self.conn = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+		# (A server can be given a socket that is already listening, e.g. one handed over by another server process.)
+		self.conn = sock or socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 
 		if server:
 			self.ClientThreads = {}
-			self.conn.bind((IP, port))
-			self.conn.listen(NumberOfPlayers)
+			self.Listening = True
+
+			# If set, a file descriptor that stops the server accepting connections once it becomes readable.
+			self.Interrupt = None
+
+			if not sock:
+				self.conn.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+				self.conn.bind((IP, port))
+
+				if NumberOfPlayers:
+					self.conn.listen(NumberOfPlayers)
+				else:
+					self.conn.listen()
+
+			# If no ThreadedFunction is given, the caller is expected to call AcceptConnections itself.
+			if ThreadedFunction:
+				self.AcceptConnections(ThreadedFunction, NumberOfPlayers, AccessToken, password, ManuallyVerify)
+
+		else:
+			self.addr = (IP, port)
+			self.InfoDict = self.ClientConnect(password, ResumeToken)
+
+	def AcceptConnections(self, ThreadedFunction, NumberOfPlayers=0, AccessToken='', password='', ManuallyVerify=False,
+	                      Admit=None):
+		"""
+
+		Accept connections until the expected number of players have connected to the server...
+		...or until StopListening is called, if NumberOfPlayers is 0.
 
-			NumberOfClients = 0
+		"""
+
+		NumberOfClients = 0
+
+		try:
+			handler = IPHandler(AccessToken) if AccessToken else None
+		except:
+			handler = None
+
+		print(f'Ready to accept connections to the server (time {GetTime()}).\n')
+
+		while self.Listening and (NumberOfClients < NumberOfPlayers or not NumberOfPlayers):
+			if self.Interrupt is not None and self.Interrupt in select.select([self.conn, self.Interrupt], [], [])[0]:
+				break
 
 			try:
-				handler = IPHandler(AccessToken) if AccessToken else None
+				NumberOfClients += self.ServerConnect(ThreadedFunction, handler, NumberOfClients,
+				                                      password, ManuallyVerify, Admit)
 			except:
-				handler = None
+				if not self.Listening:
+					break
 
-			print(f'Ready to accept connections to the server (time {GetTime()}).\n')
+				# A server with no fixed number of players shouldn't stop listening because one connection failed.
+				if NumberOfPlayers:
+					raise
 
-			while NumberOfClients < NumberOfPlayers:
-				NumberOfClients += self.ServerConnect(ThreadedFunction, handler, NumberOfClients,
-				                                      password, ManuallyVerify)
+				print(format_exc())
+				print(f'Failed to accept a connection at {GetTime()}.\n')
 
+		if NumberOfPlayers:
 			print('Maximum number of connections received; no longer open for connections.')
 
-		else:
-			self.addr = (IP, port)
-			self.InfoDict = self.ClientConnect(password)
+	def StopListening(self):
+		self.Listening = False
+
+		try:
+			self.conn.shutdown(socket.SHUT_RDWR)
+		except OSError:
+			pass
 
-	def ServerConnect(self, ThreadedFunction, handler, NumberOfClients, password, ManuallyVerify):
+		self.conn.close()
+
+	def ServerConnect(self, ThreadedFunction, handler, NumberOfClients, password, ManuallyVerify, Admit=None):
 		conn, addr = self.conn.accept()
 
+		# If the server is too busy, we want to turn the connection away before doing any more work for it...
+		# ...but if there's a password, the client will be expecting the key exchange first.
+		if Admit and password:
+			if not self.CheckPassword(conn, password):
+				return 0
+
+			password = ''
+
+		# (If there's still a password to check, the client sends its resume token after that.)
+		Token = None if password else self.ReceiveToken(conn)
+
+		if Admit and (Rejection := Admit(addr, Token)):
+			Reason, RetryAfter = Rejection
+			print(f'Turned away the connection from {addr} at {GetTime()}: {Reason}.')
+			self.send({'game': None, 'player': None, 'playerindex': -1, 'Reason': Reason, 'RetryAfter': RetryAfter},
+			          conn=conn)
+			self.CloseConnection(conn)
+			return 0
+
 		if handler:
 			handler.CheckIPDetails(addr)
 
@@ -71,24 +142,47 @@ class Network(object):
 				return 0
 
 		if password:
-			Checker = PasswordChecker(self, conn, True)
-
-			if not Checker.ServerChecksPassword(conn, password):
-				print('Client entered the wrong password; declining attempted connection.')
-				self.CloseConnection(conn)
+			if not self.CheckPassword(conn, password):
 				return 0
 
-		self.ClientThreads[conn] = Thread(target=ThreadedFunction, args=(self, NumberOfClients, conn, addr))
+			Token = self.ReceiveToken(conn)
+
+		self.ClientThreads[conn] = Thread(target=ThreadedFunction, args=(self, NumberOfClients, conn, addr, Token))
 		self.ClientThreads[conn].start()
 		return 1
 
-	def ClientConnect(self, password):
+	def CheckPassword(self, conn, password):
+		Checker = PasswordChecker(self, conn, True)
+
+		if not Checker.ServerChecksPassword(conn, password):
+			print('Client entered the wrong password; declining attempted connection.')
+			self.CloseConnection(conn)
+			return False
+
+		return True
+
+	def ReceiveToken(self, conn):
+		"""The resume token a client sends on connecting (a client that doesn't send one in time is treated as new)"""
+
+		conn.settimeout(5)
+
+		try:
+			Token = self.SubReceive(ResumeTokenLength, conn).decode(errors='replace').strip('-')
+		except socket.timeout:
+			Token = ''
+		finally:
+			conn.settimeout(None)
+
+		return Token
+
+	def ClientConnect(self, password, ResumeToken=''):
 		self.conn.connect(self.addr)
 
 		if password:
 			Checker = PasswordChecker(self, self.conn, False)
 			Checker.ClientSendsPassword(password)
 
+		self.conn.sendall((ResumeToken or '').ljust(ResumeTokenLength, '-')[:ResumeTokenLength].encode())
 		return self.receive()
 
 	def ClientSimpleSend(self, data):
@@ -96,7 +190,7 @@ class Network(object):
 		self.conn.sendall(data.encode())
 		return self.receive()
 
-	def send(self, messagetype='', data='', conn=None):
+	def send(self, messagetype='', data='', conn=None, pickled=False):
 		if not conn:
 			conn = self.conn
 
@@ -111,7 +205,8 @@ class Network(object):
 		# Convert the data we want to send into binary.
 		# Create a header telling the other computer the size of the data we want to send.
 		# Turn the header into a fixed-length message, encode it.
-		PickledMessage = pickle.dumps(message)
+		# (The server may have pickled the message already, if it is sending the same message to several clients.)
+		PickledMessage = message if pickled else pickle.dumps(message)
 		Header = str(len(PickledMessage))
 		Header = f'{Header}{"".join(("-" for i in range(10 - len(Header))))}'.encode()
 
@@ -146,6 +241,11 @@ class Network(object):
 
 		while AmountToReceive > 0:
 			chunk = (conn.recv(min(8192, AmountToReceive)))
+
+			# The other side has closed the connection.
+			if not chunk:
+				break
+
 			AmountToReceive -= len(chunk)
 			response.append(chunk)
 
@@ -154,12 +254,21 @@ class Network(object):
 
 	@staticmethod
 	def CloseConnection(conn):
-		conn.shutdown(socket.SHUT_RDWR)
+		Network.ShutConnection(conn)
 		conn.close()
 
+	@staticmethod
+	def ShutConnection(conn):
+		"""Shut a connection down without closing it, waking up the thread that is handling it (which closes it)"""
+
+		try:
+			conn.shutdown(socket.SHUT_RDWR)
+		except OSError:
+			pass
+
 	def CloseDown(self):
 		if self.server:
-			self.ClientThreads = [self.CloseConnection(conn) for conn in self.ClientThreads]
+			self.ClientThreads = [self.ShutConnection(conn) for conn in list(self.ClientThreads)]
 		else:
 			self.ClientSimpleSend('Terminate')
 			self.CloseConnection(self.conn)
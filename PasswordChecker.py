@@ -5,9 +5,11 @@ from Crypto.Util.number import getPrime
 from Crypto.Util.Padding import pad, unpad
 from string import ascii_letters, digits, punctuation
 from secrets import choice
+from os import environ
 
 
-PasswordLength = YOUR_DESIRED_PASSWORD_LENGTH
+# Client and server must agree on this; set the environment variable to change it (see README).
+PasswordLength = int(environ.get('KNOCK_PASSWORD_LENGTH', 16))
 PrintableCharacters = ''.join((digits, ascii_letters, punctuation))
 
 
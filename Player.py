@@ -1,19 +1,62 @@
-from Card import Card
+from Rules import BitCount, Bitboard, RoundPoints, SuitMasks, Suits
+
+
+def SuitRanks(TrumpSuit, Present):
+	"""
+
+	Where each suit goes in a hand (the highest first), given the suits present in it (as a bitmask of suit indices).
+	Black and red suits alternate wherever they can, with trumps first (or last, if they can't be first).
+
+	"""
+
+	Ranks = [0] * 4
+
+	if BitCount(Present) == 3:
+		Missing = (~Present & 15).bit_length() - 1
+		a, b, c = (Suits[(Missing + i) % 4] for i in (1, 2, 3))
+		Ranks[Suits.index(a)] = 1 if TrumpSuit == c else 3
+		Ranks[Suits.index(b)] = 2
+		Ranks[Suits.index(c)] = 3 if TrumpSuit == c else 1
+	else:
+		Order = Suits[(Suits.index(TrumpSuit) + 1):] + Suits[:(Suits.index(TrumpSuit) + 1)]
+		Ranks = [Order.index(Suit) for Suit in Suits]
+
+	return Ranks
+
+
+def SuitsPresent(Hand):
+	Present = 0
+
+	for card in Hand:
+		Present |= 1 << (card.Index // 13)
+
+	return Present
+
+
+# For each trump suit and each combination of suits present: a sort key for each card (by card index).
+HandOrders = {
+	TrumpSuit: [
+		tuple(Ranks[card // 13] * 13 + card % 13 for card in range(52))
+		for Ranks in (SuitRanks(TrumpSuit, Present) for Present in range(16))
+	]
+	for TrumpSuit in Suits
+}
 
 
 class Player(object):
 	"""Class object for representing a single player in the game."""
 
 	__slots__ = 'name', 'playerindex', 'Hand', 'Bid', 'Points', 'GamesWon', 'PointsThisRound', 'Tricks', 'RoundLeader', \
-	            'HandIteration', 'ActionComplete'
-
-	AllPlayers = []
+	            'HandIteration', 'ActionComplete', 'Bot', 'HandMask', 'SuitCounts'
 
 	def __init__(self, playerindex):
-		self.AllPlayers.append(self)
 		self.name = playerindex
 		self.playerindex = playerindex
 		self.Hand = []
+
+		# The cards in the hand as a bitboard (see Rules.py), and how many cards of each suit it has.
+		self.HandMask = 0
+		self.SuitCounts = [0] * 4
 		self.Bid = -1
 		self.Points = 0
 		self.Tricks = 0
@@ -22,69 +65,46 @@ class Player(object):
 		self.RoundLeader = False
 		self.ActionComplete = False
 		self.HandIteration = 1
+		self.Bot = False
 
 	def AddName(self, name):
 		self.name = name
 		return self
 
+	def BecomeBot(self):
+		"""The server will make this player's decisions from now on (e.g. if the human playing them has left)"""
+
+		self.Bot = True
+		self.ActionComplete = True
+		self.name = f'{self.name} (bot)' if isinstance(self.name, str) else f'Bot {self.playerindex + 1}'
+		return self
+
 	def NextStage(self):
 		self.ActionComplete = False
 		return self
 
-	@staticmethod
-	def CardSortHelper(Hand, Suits):
-		"""Helper method for the SortHand method below"""
-
-		return all(any(card.ActualSuit == Suit for card in Hand) for Suit in Suits)
-
-	@staticmethod
-	def MidRoundSortHelper(Hand, SuitPlayed, SuitTuple):
-		"""Helper method for the SortHand method below"""
+	def SortHand(self, Hand, TrumpSuit, SuitPlayed='', SuitTuple=('', '')):
+		"""
 
-		return all((SuitPlayed, any((any(SuitPlayed == card.ActualSuit for card in Hand), (SuitPlayed in SuitTuple)))))
+		Method to ensure the Hand is ordered black-red-black-red wherever possible.
+		Mid-round (once a card of SuitPlayed has been taken out of it), the hand is only rearranged...
+		...if a suit has just run out from the middle of it: SuitTuple is the suits that were at either end.
 
-	def SortHand(self, Hand, TrumpSuit, SuitPlayed='', SuitTuple=('', '')):
-		"""Method to ensure the Hand is ordered black-red-black-red wherever possible"""
+		"""
 
-		if SuitPlayed and not Hand:
-			return Hand
+		Present = SuitsPresent(Hand)
 
-		Hand = [card.SetTrumpSuit(TrumpSuit) for card in Hand]
-
-		if self.CardSortHelper(Hand, 'C'):
-			if self.CardSortHelper(Hand, 'D'):
-				if self.CardSortHelper(Hand, 'S'):
-					if self.CardSortHelper(Hand, 'H'):
-						if SuitPlayed:
-							return Hand
-						return sorted(Hand, key=Card.SuitAndValue, reverse=True)
-					elif self.MidRoundSortHelper(Hand, SuitPlayed, SuitTuple):
-						return Hand
-					return sorted(Hand, key=Card.SuitAndValueWithoutHearts, reverse=True)
-				elif self.CardSortHelper(Hand, 'H'):
-					if self.MidRoundSortHelper(Hand, SuitPlayed, SuitTuple):
-						return Hand
-					return sorted(Hand, key=Card.SuitAndValueWithoutSpades, reverse=True)
-				elif SuitPlayed:
-					return Hand
-			elif self.CardSortHelper(Hand, ('S', 'H')):
-				if self.MidRoundSortHelper(Hand, SuitPlayed, SuitTuple):
-					return Hand
-				return sorted(Hand, key=Card.SuitAndValueWithoutDiamonds, reverse=True)
-			elif SuitPlayed:
-				return Hand
-		elif self.CardSortHelper(Hand, ('D', 'S', 'H')):
-			if self.MidRoundSortHelper(Hand, SuitPlayed, SuitTuple):
-				return Hand
-			return sorted(Hand, key=Card.SuitAndValueWithoutClubs, reverse=True)
-		elif SuitPlayed:
+		if SuitPlayed and (BitCount(Present) != 3 or Present >> Suits.index(SuitPlayed) & 1 or SuitPlayed in SuitTuple):
 			return Hand
 
-		return sorted(Hand, key=Card.SuitAndValue, reverse=True)
+		Keys = HandOrders[TrumpSuit][Present]
+		return sorted(Hand, key=lambda card: Keys[card.Index], reverse=True)
 
 	def ReceiveCards(self, cards, TrumpSuit):
 		# Must receive an argument in the form of a list
-		self.Hand = [card.AddToHand(self, i) for i, card in enumerate(self.SortHand(cards, TrumpSuit))]
+		self.Hand = self.SortHand(cards, TrumpSuit)
+		self.HandMask = Bitboard(card.Index for card in cards)
+		self.SuitCounts = [BitCount(self.HandMask & Mask) for Mask in SuitMasks]
 		self.HandIteration += 1
 		return self
 
@@ -98,16 +118,15 @@ class Player(object):
 		SuitTuple = (Hand[0].ActualSuit, Hand[-1].ActualSuit)
 		Hand.remove(card)
 		Suit = card.ActualSuit
+		self.HandMask ^= 1 << card.Index
+		self.SuitCounts[card.Index // 13] -= 1
 
-		Hand = [
-			card.SetPos(i) for i, card in enumerate(
-				self.SortHand(Hand, TrumpSuit, SuitPlayed=Suit, SuitTuple=SuitTuple)
-			)
-		]
-
-		self.Hand = Hand
+		self.Hand = self.SortHand(Hand, TrumpSuit, SuitPlayed=Suit, SuitTuple=SuitTuple)
 		self.HandIteration += 1
 
+	def Holds(self, card):
+		return self.HandMask >> card.Index & 1
+
 	def WinsTrick(self):
 		self.PointsThisRound += 1
 		self.Tricks += 1
@@ -127,7 +146,7 @@ class Player(object):
 		return self.GamesWon
 
 	def ReceivePoints(self):
-		self.PointsThisRound += (10 if self.Bid == self.PointsThisRound else 0)
+		self.PointsThisRound = RoundPoints(self.Bid, self.Tricks)
 		self.Points += self.PointsThisRound
 		return self
 
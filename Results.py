@@ -0,0 +1,217 @@
+"""
+
+Class for keeping the results of every round and game played on the server in an SQLite database...
+...so that leaderboards and players' statistics survive the server restarting, and can be looked up at any time.
+
+Run this script with the path to a results database to print its leaderboard (or a player's statistics).
+
+"""
+
+import sqlite3, sys, traceback
+
+from collections import deque
+from contextlib import closing
+from datetime import datetime
+from threading import Thread, Condition
+
+from Clock import GetTime
+
+
+Schema = '''
+CREATE TABLE IF NOT EXISTS Rounds (
+	TableID INTEGER, Started REAL, Finished REAL, RoundNumber INTEGER, CardNumber INTEGER, TrumpSuit TEXT,
+	Seat INTEGER, Player TEXT, Bot INTEGER, Bid INTEGER, Tricks INTEGER, Points INTEGER, TotalPoints INTEGER, Seed INTEGER,
+	PRIMARY KEY (TableID, Started, RoundNumber, Seat)
+);
+
+CREATE TABLE IF NOT EXISTS Games (
+	TableID INTEGER, Started REAL, Finished REAL, CardNumber INTEGER,
+	Seat INTEGER, Player TEXT, Bot INTEGER, Points INTEGER, Won INTEGER,
+	PRIMARY KEY (TableID, Started, Seat)
+);
+
+CREATE TABLE IF NOT EXISTS Players (
+	Player TEXT PRIMARY KEY, Bot INTEGER, Games INTEGER DEFAULT 0, GamesWon INTEGER DEFAULT 0, Points INTEGER DEFAULT 0,
+	Rounds INTEGER DEFAULT 0, ExactBids INTEGER DEFAULT 0, Tricks INTEGER DEFAULT 0, LastPlayed REAL
+);
+
+CREATE INDEX IF NOT EXISTS RoundsByPlayer ON Rounds (Player, Finished);
+CREATE INDEX IF NOT EXISTS RoundsByDate ON Rounds (Finished);
+CREATE INDEX IF NOT EXISTS GamesByPlayer ON Games (Player, Finished);
+CREATE INDEX IF NOT EXISTS GamesByDate ON Games (Finished);
+CREATE INDEX IF NOT EXISTS PlayersByWins ON Players (GamesWon DESC, Points DESC);
+'''
+
+# Running totals for each player are kept up to date as results come in, so the all-time leaderboard never has to...
+# ...add up every game ever played. (Results that are already in the database, e.g. replayed after a crash, are skipped.)
+AddRound = '''
+INSERT INTO Players (Player, Bot, Rounds, ExactBids, Tricks, LastPlayed) VALUES (?, ?, 1, ?, ?, ?)
+ON CONFLICT (Player) DO UPDATE SET
+	Rounds = Rounds + 1, ExactBids = ExactBids + excluded.ExactBids, Tricks = Tricks + excluded.Tricks,
+	LastPlayed = MAX(LastPlayed, excluded.LastPlayed)
+'''
+
+AddGame = '''
+INSERT INTO Players (Player, Bot, Games, GamesWon, Points, LastPlayed) VALUES (?, ?, 1, ?, ?, ?)
+ON CONFLICT (Player) DO UPDATE SET
+	Games = Games + 1, GamesWon = GamesWon + excluded.GamesWon, Points = Points + excluded.Points,
+	LastPlayed = MAX(LastPlayed, excluded.LastPlayed)
+'''
+
+
+class ResultsStore(object):
+	"""
+
+	Results are saved by a background thread, so that the tables never wait on the database:
+	each time it wakes up, it saves every result that is waiting in a single transaction.
+	The query functions can be called from any thread, and open their own connection to the database.
+
+	"""
+
+	__slots__ = 'Path', 'Queue', 'Changed', 'Saved'
+
+	def __init__(self, Path):
+		self.Path = Path
+		self.Queue = deque()
+		self.Changed = Condition()
+		self.Saved = 0
+
+		with closing(self.Connect()) as db:
+			db.executescript(Schema)
+
+			# (Databases made before the seed each round was dealt from was saved don't have a column for it.)
+			if 'Seed' not in [Column[1] for Column in db.execute('PRAGMA table_info(Rounds)')]:
+				db.execute('ALTER TABLE Rounds ADD COLUMN Seed INTEGER')
+
+		Thread(target=self.Run, daemon=True).start()
+
+	def Connect(self):
+		db = sqlite3.connect(self.Path, timeout=30)
+
+		# (In WAL mode, reading the database doesn't hold up the writer, or the other way round.)
+		db.execute('PRAGMA journal_mode=WAL')
+		db.execute('PRAGMA synchronous=NORMAL')
+		return db
+
+	def Save(self, TableID, Results):
+		"""Queue up results from Game.Results (a list of ('Round', dict) and ('Game', dict) tuples) to be saved"""
+
+		with self.Changed:
+			self.Queue.extend((TableID, Kind, Result) for Kind, Result in Results)
+			self.Changed.notify()
+
+	def Flush(self):
+		"""Block until every result queued up so far has been saved"""
+
+		with self.Changed:
+			Target = self.Saved + len(self.Queue)
+
+			while self.Saved < Target:
+				self.Changed.wait()
+
+	def Run(self):
+		db = self.Connect()
+
+		while True:
+			with self.Changed:
+				while not self.Queue:
+					self.Changed.wait()
+
+				Batch, self.Queue = self.Queue, deque()
+
+			try:
+				with db:
+					for TableID, Kind, Result in Batch:
+						(self.SaveRound if Kind == 'Round' else self.SaveGame)(db, TableID, Result)
+			except:
+				print(traceback.format_exc())
+				print(f'Failed to save {len(Batch)} result(s) at {GetTime()}')
+
+			with self.Changed:
+				self.Saved += len(Batch)
+				self.Changed.notify_all()
+
+	@staticmethod
+	def SaveRound(db, TableID, Result):
+		for Seat, Name, Bot, Bid, Tricks, Points, TotalPoints in Result['Players']:
+			if db.execute(
+					'INSERT OR IGNORE INTO Rounds VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+					(TableID, Result['Started'], Result['Finished'], Result['RoundNumber'], Result['CardNumber'],
+					 Result['TrumpSuit'], Seat, Name, Bot, Bid, Tricks, Points, TotalPoints, Result.get('Seed'))).rowcount:
+
+				db.execute(AddRound, (Name, Bot, int(Bid == Tricks), Tricks, Result['Finished']))
+
+	@staticmethod
+	def SaveGame(db, TableID, Result):
+		for Seat, Name, Bot, Points, Won, GamesWon in Result['Players']:
+			if db.execute(
+					'INSERT OR IGNORE INTO Games VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+					(TableID, Result['Started'], Result['Finished'], Result['CardNumber'],
+					 Seat, Name, Bot, Points, Won)).rowcount:
+
+				db.execute(AddGame, (Name, Bot, int(Won), Points, Result['Finished']))
+
+	# Queries: each returns a list of dicts (or a single dict), so callers don't need to know the schema.
+
+	def Query(self, SQL, Parameters=()):
+		with closing(self.Connect()) as db:
+			Cursor = db.execute(SQL, Parameters)
+			Columns = [Column[0] for Column in Cursor.description]
+			return [dict(zip(Columns, Row)) for Row in Cursor]
+
+	def Leaderboard(self, Limit=10, Since=None, Bots=False):
+		"""The players who have won the most games (of all time, or since the timestamp Since), best first"""
+
+		Humans = '' if Bots else 'AND NOT Bot '
+
+		if Since is None:
+			return self.Query(
+				f'SELECT Player, Games, GamesWon, Points FROM Players WHERE Games {Humans}'
+				'ORDER BY GamesWon DESC, Points DESC LIMIT ?',
+				(Limit,)
+			)
+
+		return self.Query(
+			'SELECT Player, COUNT(*) AS Games, SUM(Won) AS GamesWon, SUM(Points) AS Points FROM Games '
+			f'WHERE Finished >= ? {Humans}GROUP BY Player ORDER BY GamesWon DESC, Points DESC LIMIT ?',
+			(Since, Limit)
+		)
+
+	def PlayerStats(self, Player, RecentGames=10):
+		"""A player's all-time totals, plus their most recent games"""
+
+		if not (Totals := self.Query('SELECT * FROM Players WHERE Player = ?', (Player,))):
+			return None
+
+		Stats = Totals[0]
+		Stats['ExactBidRate'] = Stats['ExactBids'] / Stats['Rounds'] if Stats['Rounds'] else 0.0
+		Stats['WinRate'] = Stats['GamesWon'] / Stats['Games'] if Stats['Games'] else 0.0
+
+		Stats['RecentGames'] = self.Query(
+			'SELECT TableID, Started, Finished, CardNumber, Seat, Points, Won FROM Games '
+			'WHERE Player = ? ORDER BY Finished DESC LIMIT ?',
+			(Player, RecentGames)
+		)
+
+		return Stats
+
+
+if __name__ == '__main__':
+	if len(sys.argv) < 2:
+		sys.exit('Usage: Results.py <results database> [player name]')
+
+	store = ResultsStore(sys.argv[1])
+
+	if len(sys.argv) > 2:
+		if not (Stats := store.PlayerStats(sys.argv[2])):
+			sys.exit(f'No results for {sys.argv[2]!r}.')
+
+		print(f"{Stats['Player']}: {Stats['GamesWon']} of {Stats['Games']} games won ({Stats['WinRate']:.0%}), "
+		      f"{Stats['Points']} points, exact bids in {Stats['ExactBidRate']:.0%} of {Stats['Rounds']} rounds.")
+
+		for Game in Stats['RecentGames']:
+			print(f"  {datetime.fromtimestamp(Game['Finished']):%Y-%m-%d %H:%M}  table {Game['TableID']}, "
+			      f"{Game['CardNumber']} cards: {Game['Points']} points{' (won)' if Game['Won'] else ''}")
+	else:
+		for Rank, Row in enumerate(store.Leaderboard(), start=1):
+			print(f"{Rank:>3}. {Row['Player']:<24} {Row['GamesWon']:>6} wins {Row['Games']:>7} games {Row['Points']:>9} points")
@@ -0,0 +1,315 @@
+"""
+
+The rules of Knock, with nothing else attached: no networking, no waiting for the players, no drawing.
+Game (on the server), Card (on the client) and the bots all use the functions here to apply the rules...
+...and the Engine class plays whole games with them, for simulations that need to be fast.
+
+Cards are numbered from 0 to 51: the card's index is suit * 13 + (value - 2), with the suits in the order of Suits below.
+A set of cards (a hand, or the cards in a trick) can also be held as a bitboard: an int with bit n set if card n is in it...
+...so each suit is 13 bits wide, and checking, choosing or ranking cards of a suit only takes a couple of operations.
+
+"""
+
+from random import Random, SystemRandom
+
+
+Suits = ('C', 'D', 'S', 'H')
+SuitMasks = tuple(0x1FFF << (13 * Suit) for Suit in range(4))
+
+
+def CardIndex(Value, Suit):
+	return (Suits.index(Suit) * 13) + (Value - 2)
+
+
+def CardValue(Index):
+	return (Index % 13) + 2
+
+
+def CardSuit(Index):
+	return Suits[Index // 13]
+
+
+# The pack before it is shuffled (in the order the server has always built it).
+PackOrder = tuple(CardIndex(Value, Suit) for Value in range(2, 15) for Suit in ('D', 'S', 'C', 'H'))
+
+
+def NewSeed():
+	return SystemRandom().getrandbits(63)
+
+
+def RoundSeed(GameSeed, GameNumber, RoundNumber):
+	"""
+
+	The seed for shuffling the pack for one round: every game started from the same GameSeed is dealt the same cards...
+	...so a game can be replayed, and tables given the same seed play the same deals (for duplicate tournaments).
+
+	"""
+
+	return Random(f'{GameSeed}/{GameNumber}/{RoundNumber}').getrandbits(63)
+
+
+def NewPack(random):
+	"""A shuffled pack, as a list of card indices: the trump card is the last, and each hand is dealt from the end"""
+
+	Pack = list(PackOrder)
+	random.shuffle(Pack)
+	return Pack
+
+
+def Packs(Seed, Count):
+	"""
+
+	Count packs, shuffled one after another by a single generator seeded with Seed, for simulations to deal from:
+	as reproducible as seeding each deal (see Engine.Deal), but without the cost of reseeding.
+
+	"""
+
+	random = Random(Seed)
+	return [NewPack(random) for i in range(Count)]
+
+
+def Bitboard(Cards):
+	Mask = 0
+
+	for card in Cards:
+		Mask |= 1 << card
+
+	return Mask
+
+
+def Cards(Mask):
+	"""The cards in a bitboard, lowest index first"""
+
+	Cards = []
+
+	while Mask:
+		Lowest = Mask & -Mask
+		Cards.append(Lowest.bit_length() - 1)
+		Mask ^= Lowest
+
+	return Cards
+
+
+def BitCount(Mask):
+	# (int.bit_count only exists from Python 3.10.)
+	return bin(Mask).count('1')
+
+
+def HighestCard(Mask):
+	return Mask.bit_length() - 1
+
+
+def LegalMask(Hand, SuitLed):
+	"""A player must follow the suit that was led (if any: SuitLed is -1 for the first card of a trick), if they can"""
+
+	return (Hand & SuitMasks[SuitLed]) or Hand if SuitLed >= 0 else Hand
+
+
+def LegalMoves(Hand, Trick):
+	"""LegalMask, for a hand and a trick given as lists of cards"""
+
+	return Cards(LegalMask(Bitboard(Hand), Trick[0] // 13 if Trick else -1))
+
+
+def FollowsSuit(card, SuitLed, SuitCounts):
+	"""Whether a player holding card may play it: SuitCounts is how many cards of each suit they hold"""
+
+	return SuitLed < 0 or card // 13 == SuitLed or not SuitCounts[SuitLed]
+
+
+def WinValue(card, SuitLed, TrumpSuit):
+	"""How highly a card ranks in a trick: cards of the suit led beat other suits, and trumps beat everything"""
+
+	return TrickRanks[SuitLed][TrumpSuit][card]
+
+
+def Rank(card, SuitLed, TrumpSuit):
+	if (Suit := card // 13) == SuitLed:
+		return CardValue(card)
+
+	return CardValue(card) + 13 if Suit == TrumpSuit else 0
+
+
+# Every card's rank in a trick (see WinValue), for each suit that can be led and each trump suit.
+TrickRanks = tuple(
+	tuple(tuple(Rank(card, SuitLed, TrumpSuit) for card in range(52)) for TrumpSuit in range(4))
+	for SuitLed in range(4)
+)
+
+
+def TrickWinner(Trick, TrumpSuit):
+	"""The position in the trick (0 for the card led) of the card that wins it; TrumpSuit is a suit index"""
+
+	Ranks = TrickRanks[Trick[0] // 13][TrumpSuit]
+	Best = 0
+
+	for i in range(1, len(Trick)):
+		if Ranks[Trick[i]] > Ranks[Trick[Best]]:
+			Best = i
+
+	return Best
+
+
+def TrickWinningCard(TrickMask, SuitLed, TrumpSuit):
+	"""The card that wins a trick given as a bitboard: the highest trump if there are any, or the highest card of the suit led"""
+
+	return HighestCard((TrickMask & SuitMasks[TrumpSuit]) or (TrickMask & SuitMasks[SuitLed]))
+
+
+def RoundPoints(Bid, Tricks):
+	"""A point for each trick won, plus ten for winning exactly as many tricks as were bid"""
+
+	return Tricks + (10 if Bid == Tricks else 0)
+
+
+class Engine(object):
+	"""
+
+	A game of Knock between PlayerNumber seats, starting with StartCardNumber cards and going down to one.
+	Each round: Deal(), then Bid() for every seat (in any order), then Play() in turn until the round is over.
+	Hands are kept as bitboards, and the trick as a bitboard plus the cards in the order they were played.
+	Any illegal action raises ValueError, and leaves the game unchanged.
+
+	"""
+
+	__slots__ = 'PlayerNumber', 'StartCardNumber', 'Random', 'RoundNumber', 'CardNumber', 'Hands', 'TrumpCard', \
+	            'TrumpSuit', 'Bids', 'Tricks', 'Points', 'Turn', 'Leader', 'Trick', 'TrickMask', 'Phase', \
+	            'Seed', 'DealSeed'
+
+	def __init__(self, PlayerNumber, StartCardNumber=0, Seed=None):
+		assert 2 <= PlayerNumber <= 6, 'Knock is played by between 2 and 6 players.'
+
+		self.PlayerNumber = PlayerNumber
+		self.StartCardNumber = StartCardNumber or min(13, 51 // PlayerNumber)
+		assert 1 <= self.StartCardNumber <= 51 // PlayerNumber, 'There are not enough cards for that many players.'
+
+		# Each round is dealt from a seed derived from the game's (see RoundSeed), as the server deals its games.
+		# self.Random is for the players' decisions, if they need one.
+		self.Seed = NewSeed() if Seed is None else Seed
+		self.DealSeed = None
+		self.Random = Random(self.Seed)
+		self.RoundNumber = 0
+		self.CardNumber = 0
+		self.Hands = [0] * PlayerNumber
+		self.TrumpCard = -1
+		self.TrumpSuit = -1
+		self.Bids = [-1] * PlayerNumber
+		self.Tricks = [0] * PlayerNumber
+		self.Points = [0] * PlayerNumber
+		self.Turn = -1
+		self.Leader = -1
+		self.Trick = []
+		self.TrickMask = 0
+
+		# 'Deal', 'Bid', 'Play' or 'Over': what has to happen next.
+		self.Phase = 'Deal'
+
+	def Deal(self, Seed=None, Pack=None):
+		"""Start the next round, shuffling the pack from Seed (by default, the round's seed): or deal Pack, if given"""
+
+		if self.Phase != 'Deal':
+			raise ValueError(f'Cannot deal now: the game is waiting for {self.Phase}.')
+
+		if Pack is None:
+			self.DealSeed = RoundSeed(self.Seed, 0, self.RoundNumber + 1) if Seed is None else Seed
+			Pack = NewPack(Random(self.DealSeed))
+		else:
+			self.DealSeed, Pack = None, list(Pack)
+
+		self.RoundNumber += 1
+		self.CardNumber = self.StartCardNumber + 1 - self.RoundNumber
+		self.TrumpCard = Pack.pop()
+		self.TrumpSuit = self.TrumpCard // 13
+		self.Hands = [Bitboard(Pack.pop() for i in range(self.CardNumber)) for Seat in range(self.PlayerNumber)]
+		self.Bids = [-1] * self.PlayerNumber
+		self.Tricks = [0] * self.PlayerNumber
+		self.Turn = self.Leader = (self.RoundNumber - 1) % self.PlayerNumber
+		self.Trick = []
+		self.TrickMask = 0
+		self.Phase = 'Bid'
+		return self.Hands
+
+	def Bid(self, Seat, Number):
+		if self.Phase != 'Bid' or self.Bids[Seat] != -1:
+			raise ValueError(f'Seat {Seat} cannot bid now.')
+
+		if not 0 <= Number <= self.CardNumber:
+			raise ValueError(f'A bid must be between 0 and {self.CardNumber}.')
+
+		self.Bids[Seat] = Number
+
+		if -1 not in self.Bids:
+			self.Phase = 'Play'
+
+	def LegalMask(self, Seat):
+		"""The cards Seat may play now, as a bitboard (empty, if it isn't Seat's turn)"""
+
+		if self.Phase != 'Play' or Seat != self.Turn:
+			return 0
+
+		return LegalMask(self.Hands[Seat], self.Trick[0] // 13 if self.Trick else -1)
+
+	def LegalMoves(self, Seat):
+		return Cards(self.LegalMask(Seat))
+
+	def Play(self, Seat, card):
+		"""Seat plays a card (by index); returns the seat that won the trick, if this card completed one"""
+
+		if not self.LegalMask(Seat) >> card & 1:
+			raise ValueError(f'Seat {Seat} cannot play card {card} now.')
+
+		self.Hands[Seat] ^= 1 << card
+		self.Trick.append(card)
+		self.TrickMask |= 1 << card
+
+		if len(self.Trick) < self.PlayerNumber:
+			self.Turn = (Seat + 1) % self.PlayerNumber
+			return None
+
+		WinningCard = TrickWinningCard(self.TrickMask, self.Trick[0] // 13, self.TrumpSuit)
+		Winner = (self.Leader + self.Trick.index(WinningCard)) % self.PlayerNumber
+		self.Tricks[Winner] += 1
+		self.Turn = self.Leader = Winner
+		self.Trick = []
+		self.TrickMask = 0
+
+		if not self.Hands[Winner]:
+			self.EndRound()
+
+		return Winner
+
+	def EndRound(self):
+		for Seat in range(self.PlayerNumber):
+			self.Points[Seat] += RoundPoints(self.Bids[Seat], self.Tricks[Seat])
+
+		self.Turn = -1
+		self.Phase = 'Over' if self.CardNumber == 1 else 'Deal'
+
+	def Score(self):
+		"""Each seat's points so far, and the seats with the most points (the winners, once the game is over)"""
+
+		Best = max(self.Points)
+		return list(self.Points), [Seat for Seat in range(self.PlayerNumber) if self.Points[Seat] == Best]
+
+
+def PlayGame(PlayerNumber, ChooseBid, ChooseMove, StartCardNumber=0, Seed=None):
+	"""
+
+	Play a whole game, with every seat's decisions made by the functions given:
+	ChooseBid(engine, Seat) returns a bid, and ChooseMove(engine, Seat) returns one of engine.LegalMoves(Seat).
+	Returns the final score (see Engine.Score).
+
+	"""
+
+	engine = Engine(PlayerNumber, StartCardNumber, Seed)
+
+	while engine.Phase != 'Over':
+		engine.Deal()
+
+		for Seat in range(PlayerNumber):
+			engine.Bid(Seat, ChooseBid(engine, Seat))
+
+		while engine.Phase == 'Play':
+			engine.Play(engine.Turn, ChooseMove(engine, engine.Turn))
+
+	return engine.Score()
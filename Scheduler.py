@@ -0,0 +1,219 @@
+"""
+
+Two classes for playing many tables from a single thread (or a small pool of threads):
+a Scheduler, which only steps a table when something has happened at it, or when a timer it asked for runs out...
+...and the TimerWheel holding the timers of every table the Scheduler is looking after.
+
+"""
+
+import traceback
+
+from itertools import count
+from math import ceil
+from threading import Thread, Condition
+from time import monotonic
+
+from Clock import GetTime
+
+
+class TimerWheel(object):
+	"""
+
+	Hierarchical timer wheel: adding or removing a timer costs the same however many timers there are.
+	Each level has 64 slots; a slot at level 0 covers one tick, and a slot at each level above covers 64 times as long.
+	Timers are added to the lowest level that can hold them, and move down a level each time that level comes round.
+
+	"""
+
+	__slots__ = 'Resolution', 'Start', 'Now', 'Wheels', 'Overflow', 'Count'
+
+	SlotBits = 6
+	Slots = 1 << SlotBits
+	Levels = 4
+
+	def __init__(self, Resolution=0.01):
+		self.Resolution = Resolution
+		self.Start = monotonic()
+		self.Now = 0
+		self.Wheels = [[[] for i in range(self.Slots)] for level in range(self.Levels)]
+		self.Overflow = []
+		self.Count = 0
+
+	def Tick(self, Time):
+		return (Time - self.Start) / self.Resolution
+
+	def Add(self, Time, item):
+		"""Have item returned by Expire() once monotonic() reaches Time"""
+
+		self.Place(max(self.Now + 1, ceil(self.Tick(Time))), item)
+		self.Count += 1
+
+	def Place(self, Tick, item):
+		Delta = Tick - self.Now
+
+		for level in range(self.Levels):
+			if Delta < (1 << (self.SlotBits * (level + 1))):
+				self.Wheels[level][(Tick >> (self.SlotBits * level)) & (self.Slots - 1)].append((Tick, item))
+				return None
+
+		self.Overflow.append((Tick, item))
+
+	def Cascade(self, level):
+		"""Move the timers in the current slot of this level down to the levels below"""
+
+		Index = (self.Now >> (self.SlotBits * level)) & (self.Slots - 1)
+		Timers, self.Wheels[level][Index] = self.Wheels[level][Index], []
+
+		for Tick, item in Timers:
+			self.Place(Tick, item)
+
+	def Expire(self, Time):
+		"""Returns the items of every timer that has run out by Time"""
+
+		Target = int(self.Tick(Time))
+		Expired = []
+
+		# (With no timers, there's nothing to move down the levels.)
+		if not self.Count:
+			self.Now = max(self.Now, Target)
+
+		while self.Now < Target:
+			self.Now += 1
+
+			for level in range(1, self.Levels):
+				if self.Now & ((1 << (self.SlotBits * level)) - 1):
+					break
+
+				self.Cascade(level)
+			else:
+				Overflow, self.Overflow = self.Overflow, []
+
+				for Tick, item in Overflow:
+					self.Place(Tick, item)
+
+			Slot = self.Wheels[0][self.Now & (self.Slots - 1)]
+
+			if Slot:
+				Expired.extend(item for Tick, item in Slot)
+				self.Count -= len(Slot)
+				Slot.clear()
+
+		return Expired
+
+	def NextTime(self):
+		"""When Expire() should next be called (or None if there are no timers)"""
+
+		if not self.Count:
+			return None
+
+		# Either a timer at level 0 runs out, or level 0 comes round and timers move down from the level above.
+		Mask = self.Slots - 1
+		NextRound = (self.Now | Mask) + 1
+		NextTick = next((self.Now + i for i in range(1, self.Slots) if self.Wheels[0][(self.Now + i) & Mask]), NextRound)
+		return self.Start + (min(NextTick, NextRound) * self.Resolution)
+
+
+class Scheduler(object):
+	"""
+
+	Anything with a Step() method can be added to a Scheduler as a task.
+	Step() is called whenever the task is woken up, and never by two threads at once.
+	It should return None to sleep until it is next woken up, or a number of seconds to sleep for at most.
+
+	A task has at most one timer: each step cancels the one it had, and setting a new one replaces the old one.
+	(The timer wheel can't take timers out, so a cancelled timer is left in it, and ignored when it runs out.)
+
+	"""
+
+	__slots__ = 'Tasks', 'Ready', 'Running', 'Timers', 'Armed', 'Numbers', 'Changed', 'Threads', 'Stopped'
+
+	def __init__(self, ThreadNumber=1):
+		self.Tasks = set()
+		self.Ready = {}
+		self.Running = set()
+		self.Timers = TimerWheel()
+		self.Changed = Condition()
+		self.Stopped = False
+
+		# The number of each task's current timer: only the timer with that number can wake the task up.
+		self.Armed = {}
+		self.Numbers = count()
+
+		self.Threads = [Thread(target=self.Run, daemon=True) for i in range(ThreadNumber)]
+
+		for thread in self.Threads:
+			thread.start()
+
+	def Add(self, task):
+		with self.Changed:
+			self.Tasks.add(task)
+
+		self.Wake(task)
+
+	def Remove(self, task):
+		with self.Changed:
+			self.Tasks.discard(task)
+			self.Ready.pop(task, None)
+			self.Armed.pop(task, None)
+
+	def Wake(self, task):
+		"""Step the task as soon as possible (if it is already waiting to be stepped, this does nothing)"""
+
+		with self.Changed:
+			if task in self.Tasks and task not in self.Ready:
+				self.Ready[task] = None
+				self.Changed.notify()
+
+	def WakeAfter(self, task, Seconds):
+		with self.Changed:
+			if task in self.Tasks:
+				self.Armed[task] = Number = next(self.Numbers)
+				self.Timers.Add(monotonic() + Seconds, (task, Number))
+				self.Changed.notify()
+
+	def Stop(self):
+		"""Have the scheduler's threads finish the steps they're on, then end (it can't be started again)"""
+
+		with self.Changed:
+			self.Stopped = True
+			self.Changed.notify_all()
+
+	def NextTask(self):
+		"""Block until a task needs to be stepped, then take it off the ready queue (returns None once stopped)"""
+
+		with self.Changed:
+			while not self.Stopped:
+				for task, Number in self.Timers.Expire(monotonic()):
+					if self.Armed.get(task) == Number:
+						del self.Armed[task]
+						self.Ready[task] = None
+
+				# (Tasks being stepped by another thread are left in the queue until that thread has finished with them.)
+				if task := next((task for task in self.Ready if task not in self.Running), None):
+					del self.Ready[task]
+					self.Armed.pop(task, None)
+					self.Running.add(task)
+					return task
+
+				self.Changed.wait(None if (NextTime := self.Timers.NextTime()) is None else max(0, NextTime - monotonic()))
+
+			return None
+
+	def Run(self):
+		while (task := self.NextTask()) is not None:
+			try:
+				Wait = task.Step()
+			except:
+				print(traceback.format_exc())
+				print(f'Exception occurred in the scheduler at {GetTime()}')
+				Wait = None
+
+			with self.Changed:
+				self.Running.discard(task)
+
+				# (In case the task was woken up again while it was being stepped.)
+				if task in self.Ready:
+					self.Changed.notify()
+
+			if Wait is not None:
+				self.WakeAfter(task, Wait)
@@ -0,0 +1,234 @@
+"""
+
+Class for gathering the settings of the server script...
+...from a JSON config file, environment variables and the command line (in increasing order of priority).
+
+"""
+
+import json, socket
+
+from argparse import ArgumentParser
+from os import environ
+
+
+def ParseBool(value):
+	"""Function for interpreting 'yes'/'no'-style strings from the environment or the command line"""
+
+	if isinstance(value, bool):
+		return value
+
+	if (value := str(value).strip().lower()) in ('1', 'true', 'yes', 'y', 'on'):
+		return True
+
+	if value in ('', '0', 'false', 'no', 'n', 'off'):
+		return False
+
+	raise ValueError(f'Could not interpret {value!r} as yes or no.')
+
+
+def Check(Condition, Message):
+	"""Raise ValueError with Message unless Condition holds (unlike assert, this still works under python -O)"""
+
+	if not Condition:
+		raise ValueError(Message)
+
+
+class ServerConfig(object):
+	"""Class holding the settings used to run the server, whether it is being run interactively or headlessly."""
+
+	# Each setting: (default, type, environment variable, command-line flag, help text)
+	Settings = {
+		'Headless': (False, ParseBool, 'KNOCK_HEADLESS', '--headless',
+		             'Run without any interactive prompts'),
+
+		'Host': ('', str, 'KNOCK_HOST', '--host',
+		         'Address to bind the server to (default: all interfaces)'),
+
+		'Port': (0, int, 'KNOCK_PORT', '--port',
+		         'Port to listen on'),
+
+		'PlayerNumber': (0, int, 'KNOCK_PLAYERS', '--players',
+		                 'Number of players at each table (2-6)'),
+
+		'Tables': (1, int, 'KNOCK_TABLES', '--tables',
+		           'Number of tables to host at once'),
+
+		'PasswordMode': ('none', str, 'KNOCK_PASSWORD_MODE', '--password-mode',
+		                 "'none', 'generate' (print a new random password) or 'fixed' (use --password)"),
+
+		'Password': ('', str, 'KNOCK_PASSWORD', '--password',
+		             "Password for the session, if the password mode is 'fixed'"),
+
+		'ManuallyVerify': (False, ParseBool, 'KNOCK_MANUALLY_VERIFY', '--manually-verify',
+		                   'Ask before accepting each connection (interactive mode only)'),
+
+		'AccessToken': ('', str, 'KNOCK_ACCESS_TOKEN', '--access-token',
+		                'ipinfo.io access token, for screening attempted connections'),
+
+		'RestartTables': (True, ParseBool, 'KNOCK_RESTART_TABLES', '--restart-tables',
+		                  'Reopen a table for new players once its game has ended'),
+
+		'MaxTableRuns': (0, int, 'KNOCK_MAX_TABLE_RUNS', '--max-table-runs',
+		                 'Close each table for good after this many runs (0 for no limit)'),
+
+		'MaxTables': (0, int, 'KNOCK_MAX_TABLES', '--max-tables',
+		              'Open extra tables when all are full, up to this many (0 to only ever have --tables tables)'),
+
+		'MaxConnections': (0, int, 'KNOCK_MAX_CONNECTIONS', '--max-connections',
+		                   'Turn away new players beyond this many connections (0 for no limit)'),
+
+		'MaxMessageRate': (0.0, float, 'KNOCK_MAX_MESSAGE_RATE', '--max-message-rate',
+		                   'Messages per second each connection may send before being slowed down (0 for no limit)'),
+
+		'MaxLag': (0.0, float, 'KNOCK_MAX_LAG', '--max-lag',
+		           'Turn away new players while server lag is above this many milliseconds (0 to disable)'),
+
+		'MaxCPU': (0.0, float, 'KNOCK_MAX_CPU', '--max-cpu',
+		           'Turn away new players while the server uses more than this % of a CPU core (0 to disable)'),
+
+		'RetryAfter': (10, int, 'KNOCK_RETRY_AFTER', '--retry-after',
+		               'Seconds that turned-away players are told to wait before trying again'),
+
+		'BotSeats': (0, int, 'KNOCK_BOT_SEATS', '--bot-seats',
+		             'Number of seats at each table taken by bots played by the server'),
+
+		'BotFillAfter': (0.0, float, 'KNOCK_BOT_FILL_AFTER', '--bot-fill-after',
+		                 'Fill the empty seats at a table with bots after humans have waited this many seconds '
+		                 '(0 to always wait for a full table)'),
+
+		'BotTakeover': (False, ParseBool, 'KNOCK_BOT_TAKEOVER', '--bot-takeover',
+		                'Let a bot take over the seat of a player who leaves mid-game, instead of ending the game'),
+
+		'BotCardNumber': (0, int, 'KNOCK_BOT_CARD_NUMBER', '--bot-card-number',
+		                  'How many cards a game starts with when a bot decides (0 for as many as possible, up to 13)'),
+
+		'Seed': (0, int, 'KNOCK_SEED', '--seed',
+		         'Seed for dealing the cards, so that games can be replayed (0 for a new random seed for every game)'),
+
+		'DuplicateDeals': (False, ParseBool, 'KNOCK_DUPLICATE_DEALS', '--duplicate-deals',
+		                   "Deal the same cards at every table (each table's nth game is dealt like every other's)"),
+
+		'SchedulerThreads': (1, int, 'KNOCK_SCHEDULER_THREADS', '--scheduler-threads',
+		                     'Number of threads playing the games at all tables'),
+
+		'BidTimeout': (0.0, float, 'KNOCK_BID_TIMEOUT', '--bid-timeout',
+		               'Seconds players have to bid before they are made to bid 0 (0 for no limit)'),
+
+		'PlayTimeout': (0.0, float, 'KNOCK_PLAY_TIMEOUT', '--play-timeout',
+		                'Seconds players have to play a card before their lowest legal card is played (0 for no limit)'),
+
+		'AckTimeout': (0.0, float, 'KNOCK_ACK_TIMEOUT', '--ack-timeout',
+		               "Seconds the game waits for a player's client to finish an animation (0 for no limit)"),
+
+		'Speed': ('normal', str, 'KNOCK_SPEED', '--speed',
+		          "'normal', or 'fast' (the game doesn't wait for animations, and clients skip them)"),
+
+		'LogDirectory': ('', str, 'KNOCK_LOG_DIRECTORY', '--log-directory',
+		                 'Directory to log every table to, so that games survive the server restarting (blank to disable)'),
+
+		'SnapshotEvery': (500, int, 'KNOCK_SNAPSHOT_EVERY', '--snapshot-every',
+		                  'Events logged at a table before its log is replaced with a snapshot of the table'),
+
+		'ResultsDatabase': ('', str, 'KNOCK_RESULTS_DATABASE', '--results-database',
+		                    'SQLite database to save the results of every round and game to (blank to disable)'),
+
+		'HibernateAfter': (0.0, float, 'KNOCK_HIBERNATE_AFTER', '--hibernate-after',
+		                   'Swap the game at a table out to disk after this many seconds without anything happening '
+		                   '(0 to never hibernate tables)'),
+
+		'HibernateDirectory': ('', str, 'KNOCK_HIBERNATE_DIRECTORY', '--hibernate-directory',
+		                       'Directory to keep hibernating tables in (blank for the system temporary directory)'),
+
+		'UpgradeSocket': ('', str, 'KNOCK_UPGRADE_SOCKET', '--upgrade-socket',
+		                  'Unix socket where a new server process can ask to take over from this one (blank to disable)'),
+
+		'TakeOver': (False, ParseBool, 'KNOCK_TAKE_OVER', '--take-over',
+		             'Take over the tables and connections of the server listening on --upgrade-socket')
+	}
+
+	PasswordModes = ('none', 'generate', 'fixed')
+	Speeds = ('normal', 'fast')
+
+	__slots__ = tuple(Settings)
+
+	def __init__(self, **kwargs):
+		for name, (default, *_) in self.Settings.items():
+			setattr(self, name, kwargs.get(name, default))
+
+	@classmethod
+	def Load(cls, argv=None):
+		"""Build the config from (in increasing order of priority) defaults, a config file, the environment and argv"""
+
+		parser = ArgumentParser(description='Server for the card game Knock.')
+		parser.add_argument('--config', default=environ.get('KNOCK_CONFIG', ''), help='Path to a JSON config file')
+
+		for name, (default, Type, EnvVar, Flag, Help) in cls.Settings.items():
+			if Type is ParseBool:
+				parser.add_argument(Flag, dest=name, nargs='?', const=True, type=ParseBool, help=f'{Help} [{EnvVar}]')
+			else:
+				parser.add_argument(Flag, dest=name, type=Type, help=f'{Help} [{EnvVar}]')
+
+		args = parser.parse_args(argv)
+		Values = {}
+
+		try:
+			if args.config:
+				with open(args.config) as f:
+					FileValues = json.load(f)
+
+				Check(isinstance(FileValues, dict), 'The config file must contain a JSON object.')
+
+				for name, value in FileValues.items():
+					Check(name in cls.Settings, f'Unknown setting {name!r} in the config file.')
+					Values[name] = cls.Settings[name][1](value)
+
+			for name, (default, Type, EnvVar, *_) in cls.Settings.items():
+				if EnvVar in environ:
+					Values[name] = Type(environ[EnvVar])
+
+			Values.update({name: value for name, value in vars(args).items() if name in cls.Settings and value is not None})
+
+			config = cls(**Values)
+			config.Validate()
+		except (OSError, ValueError) as e:
+			parser.error(str(e))
+
+		return config
+
+	def Validate(self):
+		Check(self.Tables >= 1, 'There must be at least one table.')
+		Check(self.MaxTableRuns >= 0, 'The maximum number of table runs cannot be negative.')
+		Check(self.SchedulerThreads >= 1, 'There must be at least one scheduler thread.')
+		Check(self.SnapshotEvery >= 1, 'Tables must be snapshotted at least every event.')
+		Check(not (self.MaxTables and self.MaxTables < self.Tables), 'The maximum number of tables is too low.')
+
+		for name in ('MaxConnections', 'MaxMessageRate', 'MaxLag', 'MaxCPU', 'RetryAfter', 'BotFillAfter', 'BotCardNumber',
+		             'BidTimeout', 'PlayTimeout', 'AckTimeout', 'HibernateAfter'):
+			Check(getattr(self, name) >= 0, f'{name} cannot be negative.')
+
+		Check(self.PasswordMode in self.PasswordModes, f'The password mode must be one of {self.PasswordModes}.')
+		Check(not (self.PasswordMode == 'fixed' and not self.Password), "A 'fixed' password mode needs a password.")
+		Check(self.Speed in self.Speeds, f'The speed must be one of {self.Speeds}.')
+
+		if self.Port:
+			Check(5000 < self.Port <= 65535, 'The port number must be between 5001 and 65535.')
+
+		if self.PlayerNumber:
+			Check(2 <= self.PlayerNumber <= 6, 'This game accepts between 2 and 6 players.')
+			Check(0 <= self.BotSeats <= self.PlayerNumber, 'There cannot be more bot seats than players.')
+			Check(self.BotCardNumber <= 51 // self.PlayerNumber, 'Bots cannot start a game with that many cards.')
+
+		if self.UpgradeSocket:
+			Check(hasattr(socket, 'AF_UNIX'), 'Servers can only be upgraded in place on Unix.')
+			Check(hasattr(socket, 'send_fds'), 'Upgrading a server in place needs Python 3.9 or later.')
+			Check(self.Headless, 'Only headless servers can be upgraded in place.')
+
+		Check(not (self.DuplicateDeals and not self.Seed), 'Duplicate deals need a seed.')
+		Check(not (self.TakeOver and not self.UpgradeSocket), 'An upgrade socket must be given to take over a server.')
+
+		if self.Headless:
+			Check(self.Port, 'A port must be given to run the server headlessly.')
+			Check(self.PlayerNumber, 'The number of players must be given to run the server headlessly.')
+			Check(not self.ManuallyVerify, 'Connections cannot be manually verified when running headlessly.')
+
+		return self
@@ -0,0 +1,305 @@
+"""
+
+A Monte Carlo simulator for Knock: it deals many rounds at once, plays them out with a playing policy...
+...and counts how many tricks each kind of hand wins (by trump length, high cards and position relative to the leader).
+The statistics are for calibrating the bots, and for showing players the odds of making each bid.
+
+Rounds are dealt and played as NumPy arrays, a batch at a time, with the rules from Rules.py.
+Without NumPy, the simulator plays the rounds one at a time with Rules.Engine instead (which is much slower).
+
+Run this script to print statistics for every number of players and cards: python Simulator.py [deals] [players]
+
+"""
+
+import sys
+
+from time import perf_counter
+
+import Rules
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+
+Values = [Rules.CardValue(card) for card in range(52)]
+
+if np:
+	CardSuits = np.arange(52) // 13
+	CardValues = np.array(Values)
+	TrickRanks = np.array(Rules.TrickRanks)
+
+
+def HandFeatures(Hand, TrumpSuit):
+	"""
+
+	What a hand (a list of card indices) is summed up by: how many trumps it has...
+	...and how many high cards (aces and kings) it has outside trumps.
+
+	"""
+
+	TrumpLength = sum(1 for card in Hand if card // 13 == TrumpSuit)
+	HighCards = sum(1 for card in Hand if card // 13 != TrumpSuit and Values[card] >= 13)
+	return TrumpLength, HighCards
+
+
+class TrickStatistics(object):
+	"""
+
+	How many tricks hands of each kind won, for one number of players and one number of cards.
+	Counts maps (trump length, high cards, position) to a list of how many hands won 0, 1, 2... tricks...
+	...where a hand's position is how many seats after the round's leader it sits (0 for the leader).
+
+	"""
+
+	__slots__ = 'PlayerNumber', 'CardNumber', 'Deals', 'Counts', 'Seconds'
+
+	def __init__(self, PlayerNumber, CardNumber):
+		self.PlayerNumber = PlayerNumber
+		self.CardNumber = CardNumber
+		self.Deals = 0
+		self.Counts = {}
+		self.Seconds = 0.0
+
+	def Add(self, TrumpLength, HighCards, Position, Tricks, Count=1):
+		Key = (TrumpLength, HighCards, Position)
+
+		if Key not in self.Counts:
+			self.Counts[Key] = [0] * (self.CardNumber + 1)
+
+		self.Counts[Key][Tricks] += Count
+
+	def Distribution(self, TrumpLength=None, HighCards=None, Position=None):
+		"""The chance of winning each number of tricks, for the hands matching whichever features are given"""
+
+		Totals, Wanted = [0] * (self.CardNumber + 1), (TrumpLength, HighCards, Position)
+
+		for Key, Counts in self.Counts.items():
+			if all(Want is None or Want == Feature for Want, Feature in zip(Wanted, Key)):
+				Totals = [Total + Count for Total, Count in zip(Totals, Counts)]
+
+		Hands = sum(Totals)
+		return [Total / Hands for Total in Totals] if Hands else Totals
+
+	def ExpectedTricks(self, **Features):
+		return sum(Tricks * Chance for Tricks, Chance in enumerate(self.Distribution(**Features)))
+
+	def BestBid(self, **Features):
+		"""The bid most likely to be made exactly, and the chance of making it"""
+
+		Distribution = self.Distribution(**Features)
+		Bid = max(range(len(Distribution)), key=Distribution.__getitem__)
+		return Bid, Distribution[Bid]
+
+	def Report(self):
+		Rate = self.Deals / self.Seconds if self.Seconds else 0
+		Lines = [f'{self.PlayerNumber} players, {self.CardNumber} card(s): {self.Deals} deals ({Rate:,.0f} per second)']
+
+		for TrumpLength in range(self.CardNumber + 1):
+			if not any(Counts for (Length, High, Seat), Counts in self.Counts.items() if Length == TrumpLength):
+				continue
+
+			Bid, Chance = self.BestBid(TrumpLength=TrumpLength)
+			Expected = self.ExpectedTricks(TrumpLength=TrumpLength)
+			Lines.append(f'  {TrumpLength} trump(s): {Expected:.2f} tricks on average; best bid {Bid} ({Chance:.0%})')
+
+		return '\n'.join(Lines)
+
+
+# Playing policies. Each gets the Playout and a (deals x 52) array of the cards each deal's player may play...
+# ...and returns the card each of them plays. This one tries to win every trick: like a bot that still needs tricks.
+
+def GreedyPolicy(playout, Legal):
+	if not playout.Position:
+		# Leading: the strongest card, counting trumps above everything else.
+		Strength = CardValues + 13 * (CardSuits == playout.TrumpSuit[:, None])
+		return np.where(Legal, Strength, -1).argmax(axis=1)
+
+	Ranks = TrickRanks[playout.SuitLed, playout.TrumpSuit]
+	Winners = Legal & (Ranks > playout.Best[:, None])
+
+	# Win as cheaply as possible; if that can't be done, throw away the cheapest card, keeping trumps if possible.
+	Cheapest = np.where(Winners, Ranks, 99).argmin(axis=1)
+	Cost = CardValues + 13 * (CardSuits == playout.TrumpSuit[:, None])
+	Discard = np.where(Legal, Cost, 99).argmin(axis=1)
+	return np.where(Winners.any(axis=1), Cheapest, Discard)
+
+
+def RandomPolicy(playout, Legal):
+	return np.where(Legal, playout.Random.random(Legal.shape), -1).argmax(axis=1)
+
+
+class Playout(object):
+	"""
+
+	A batch of rounds being played out together, one card from every deal at a time.
+	Hands is a (deals x players x 52) boolean array; the round's leader is always seat 0.
+
+	"""
+
+	__slots__ = 'Hands', 'TrumpSuit', 'Random', 'Rows', 'Leader', 'Position', 'Seat', 'SuitLed', 'Best', 'Tricks'
+
+	def __init__(self, Hands, TrumpSuit, Random):
+		Deals, PlayerNumber, _ = Hands.shape
+		self.Hands = Hands
+		self.TrumpSuit = TrumpSuit
+		self.Random = Random
+		self.Rows = np.arange(Deals)
+		self.Leader = np.zeros(Deals, dtype=np.int64)
+		self.Tricks = np.zeros((Deals, PlayerNumber), dtype=np.int64)
+
+	def Play(self, Policy):
+		Deals, PlayerNumber, _ = self.Hands.shape
+
+		while self.Hands[0, 0].any():
+			for Position in range(PlayerNumber):
+				self.Position = Position
+				self.Seat = (self.Leader + Position) % PlayerNumber
+				Hand = self.Hands[self.Rows, self.Seat]
+
+				if Position:
+					Following = Hand & (CardSuits == self.SuitLed[:, None])
+					Legal = np.where(Following.any(axis=1)[:, None], Following, Hand)
+				else:
+					Legal = Hand
+
+				Card = Policy(self, Legal)
+				self.Hands[self.Rows, self.Seat, Card] = False
+
+				if not Position:
+					self.SuitLed = CardSuits[Card]
+					self.Best = np.full(Deals, -1)
+					Winner = self.Leader.copy()
+
+				Rank = TrickRanks[self.SuitLed, self.TrumpSuit, Card]
+				Winner = np.where(Rank > self.Best, self.Seat, Winner)
+				self.Best = np.maximum(Rank, self.Best)
+
+			self.Tricks[self.Rows, Winner] += 1
+			self.Leader = Winner
+
+		return self.Tricks
+
+
+def DealBatch(Random, Deals, PlayerNumber, CardNumber):
+	"""
+
+	Deal many rounds at once: returns each deal's hands as a (deals x players x cards) array of card indices...
+	...and the trump suit of each deal (the suit of the next card in the pack).
+
+	"""
+
+	Packs = Random.random((Deals, 52)).argsort(axis=1)
+	Cards = Packs[:, :PlayerNumber * CardNumber].reshape(Deals, PlayerNumber, CardNumber)
+	return Cards, CardSuits[Packs[:, PlayerNumber * CardNumber]]
+
+
+def Simulate(PlayerNumber, CardNumber, Deals, Policy=None, Seed=None, BatchSize=20000):
+	"""
+
+	Deal and play out Deals rounds, returning their TrickStatistics.
+	Policy is a playing policy (GreedyPolicy by default), or with no NumPy, a function for Rules.PlayGame's ChooseMove.
+
+	"""
+
+	assert 2 <= PlayerNumber <= 6 and 1 <= CardNumber <= 51 // PlayerNumber, 'There are not enough cards for that.'
+
+	if not np:
+		return SimulateWithEngine(PlayerNumber, CardNumber, Deals, Policy or GreedyMove, Seed)
+
+	Policy, Random = Policy or GreedyPolicy, np.random.default_rng(Seed)
+	Statistics = TrickStatistics(PlayerNumber, CardNumber)
+	StartTime = perf_counter()
+
+	# Every combination of features and tricks is counted in one array: (trump length, high cards, position, tricks).
+	Shape = (CardNumber + 1, min(CardNumber, 8) + 1, PlayerNumber, CardNumber + 1)
+	Counts = np.zeros(Shape, dtype=np.int64)
+
+	for Start in range(0, Deals, BatchSize):
+		Batch = min(BatchSize, Deals - Start)
+		Cards, TrumpSuit = DealBatch(Random, Batch, PlayerNumber, CardNumber)
+
+		Hands = np.zeros((Batch, PlayerNumber, 52), dtype=bool)
+		Hands[np.arange(Batch)[:, None, None], np.arange(PlayerNumber)[None, :, None], Cards] = True
+
+		IsTrump = CardSuits[Cards] == TrumpSuit[:, None, None]
+		TrumpLength = IsTrump.sum(axis=2)
+		HighCards = (~IsTrump & (CardValues[Cards] >= 13)).sum(axis=2)
+		Position = np.broadcast_to(np.arange(PlayerNumber), (Batch, PlayerNumber))
+
+		Tricks = Playout(Hands, TrumpSuit, Random).Play(Policy)
+		Counts += np.bincount(
+			np.ravel_multi_index((TrumpLength, HighCards, Position, Tricks), Shape).ravel(), minlength=Counts.size
+		).reshape(Shape)
+
+	for (TrumpLength, HighCards, Position, Tricks), Count in zip(np.argwhere(Counts), Counts[Counts > 0]):
+		Statistics.Add(int(TrumpLength), int(HighCards), int(Position), int(Tricks), int(Count))
+
+	Statistics.Deals = Deals
+	Statistics.Seconds = perf_counter() - StartTime
+	return Statistics
+
+
+def GreedyMove(engine, Seat):
+	"""GreedyPolicy, for a single game played with Rules.Engine"""
+
+	Legal = engine.LegalMoves(Seat)
+	Strength = lambda card: Values[card] + (13 if card // 13 == engine.TrumpSuit else 0)
+
+	if not engine.Trick:
+		return max(Legal, key=Strength)
+
+	SuitLed = engine.Trick[0] // 13
+	Ranks = Rules.TrickRanks[SuitLed][engine.TrumpSuit]
+	Best = max(Ranks[card] for card in engine.Trick)
+
+	if Winners := [card for card in Legal if Ranks[card] > Best]:
+		return min(Winners, key=Ranks.__getitem__)
+
+	return min(Legal, key=Strength)
+
+
+def SimulateWithEngine(PlayerNumber, CardNumber, Deals, ChooseMove, Seed=None):
+	"""Simulate without NumPy: each round is a one-round game played with Rules.Engine"""
+
+	Statistics = TrickStatistics(PlayerNumber, CardNumber)
+	StartTime = perf_counter()
+
+	for Pack in Rules.Packs(Seed, Deals):
+		engine = Rules.Engine(PlayerNumber, CardNumber)
+		engine.Deal(Pack=Pack)
+		Features = [HandFeatures(Rules.Cards(Hand), engine.TrumpSuit) for Hand in engine.Hands]
+
+		for Seat in range(PlayerNumber):
+			engine.Bid(Seat, 0)
+
+		while engine.Phase == 'Play':
+			engine.Play(engine.Turn, ChooseMove(engine, engine.Turn))
+
+		for Seat, (TrumpLength, HighCards) in enumerate(Features):
+			Statistics.Add(TrumpLength, HighCards, Seat, engine.Tricks[Seat])
+
+	Statistics.Deals = Deals
+	Statistics.Seconds = perf_counter() - StartTime
+	return Statistics
+
+
+def Survey(Deals, PlayerNumbers=range(2, 7)):
+	"""TrickStatistics for every number of players given, and every number of cards they can be dealt"""
+
+	return {
+		(PlayerNumber, CardNumber): Simulate(PlayerNumber, CardNumber, Deals)
+		for PlayerNumber in PlayerNumbers for CardNumber in range(1, (51 // PlayerNumber) + 1)
+	}
+
+
+if __name__ == '__main__':
+	Deals = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+	PlayerNumbers = [int(sys.argv[2])] if len(sys.argv) > 2 else range(2, 7)
+
+	if not np:
+		print("Couldn't import numpy; simulating one round at a time (much more slowly).")
+
+	for Statistics in Survey(Deals, PlayerNumbers).values():
+		print(Statistics.Report(), end='\n\n')
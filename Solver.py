@@ -0,0 +1,505 @@
+"""
+
+A double-dummy solver for Knock: with every hand known, how many tricks can each player make sure of winning...
+...and how few can they hold themselves to, however the other players play?
+(Everyone else is treated as playing together against the player, which is the worst they could do to them.)
+
+Each question is answered by alpha-beta search, as a series of null-window searches ('can the player get at least t?'):
+moves are tried in a sensible order, only one of each run of equivalent cards is tried...
+...and what was learnt about each position is kept in a transposition table, along with which cards it depended on.
+
+Run this script to solve the rounds saved in a results database: python Solver.py <results database> [rounds]
+
+"""
+
+import sqlite3, sys
+
+from contextlib import closing
+from random import Random
+from time import perf_counter, time
+
+import Rules
+
+from Rules import BitCount, LegalMask, SuitMasks, TrickRanks
+
+
+# Each card's place in its suit (0 for a two, up to 12 for an ace), for ordering moves.
+Values = tuple(card % 13 for card in range(52))
+
+# For each suit, the lowest card that a result depended on (52 if it depended on none of the suit's cards).
+Nothing = (52, 52, 52, 52)
+
+
+def Lowered(Relevant, Suit, card):
+	"""Relevant, but depending on the cards of Suit down to card as well"""
+
+	if card >= Relevant[Suit]:
+		return Relevant
+
+	Relevant = list(Relevant)
+	Relevant[Suit] = card
+	return tuple(Relevant)
+
+
+def Depth(Cards, Lowest):
+	# (How many of Cards, which are in descending order, are Lowest or above.)
+	Number = 0
+
+	for card in Cards:
+		if card < Lowest:
+			break
+
+		Number += 1
+
+	return Number
+
+
+class Solver(object):
+	"""
+
+	Solves one deal: Hands are the players' hands as bitboards, TrumpSuit is a suit index and Leader leads the first trick.
+
+	Cards never change hands, so a position is the cards still in play, whose turn it is and the state of the trick:
+	Shape counts each player's cards in each suit (and marks the suit of the card winning the trick)...
+	...and a result found for one position holds for every position with the same shape, where the same players hold...
+	...the cards the result depended on (the highest cards of each suit, down to the card it says in Relevant).
+	So Table maps a position's Shape (with the turn and the trick) to the patterns of cards that were searched:
+	for each number of cards in each suit that mattered, a dict from who held them to bounds on Seat's tricks.
+
+	Nodes counts the positions searched. If a Deadline (a time.time()) is given, searching past it raises TimeoutError.
+
+	"""
+
+	__slots__ = 'Hands', 'TrumpSuit', 'Leader', 'PlayerNumber', 'Holders', 'Dealt', 'Shape', 'SuitKeys', 'MoveLists', \
+	            'Ranks', 'Strengths', 'Seat', 'Maximise', 'Table', 'History', 'Nodes', 'Deadline'
+
+	def __init__(self, Hands, TrumpSuit, Leader=0, Deadline=None):
+		assert len({BitCount(Hand) for Hand in Hands}) == 1, 'Every hand must have the same number of cards.'
+
+		self.Hands = list(Hands)
+		self.TrumpSuit = TrumpSuit
+		self.Leader = Leader
+		self.PlayerNumber = len(Hands)
+		self.Holders = bytearray(52)
+		self.Dealt = 0
+
+		# (The counts for each suit are followed by one for the card winning the trick, if it is of that suit.)
+		Shape = bytearray(4 * (self.PlayerNumber + 1))
+
+		for Seat, Hand in enumerate(Hands):
+			self.Dealt |= Hand
+
+			for card in Rules.Cards(Hand):
+				self.Holders[card] = Seat
+				Shape[card // 13 * (self.PlayerNumber + 1) + Seat] += 1
+
+		self.Shape = bytes(Shape)
+		self.SuitKeys = {}
+		self.MoveLists = {}
+
+		# Each card's rank in a trick, for each suit that can be led; and how strong a card is to lead.
+		self.Ranks = tuple(TrickRanks[SuitLed][TrumpSuit] for SuitLed in range(4))
+		self.Strengths = tuple(Values[card] + (13 if card // 13 == TrumpSuit else 0) for card in range(52))
+		self.Seat = -1
+		self.Maximise = True
+		self.Table = {}
+		self.History = {}
+		self.Nodes = 0
+		self.Deadline = Deadline
+
+	def MaxTricks(self, Seat):
+		"""The most tricks Seat can make sure of winning, whatever everyone else does"""
+
+		return self.Solve(Seat, True)
+
+	def MinTricks(self, Seat):
+		"""The fewest tricks Seat can make sure of holding themselves to, whatever everyone else does"""
+
+		return self.Solve(Seat, False)
+
+	def Bounds(self):
+		"""Each seat's (MinTricks, MaxTricks)"""
+
+		return [(self.MinTricks(Seat), self.MaxTricks(Seat)) for Seat in range(self.PlayerNumber)]
+
+	def Solve(self, Seat, Maximise):
+		# When minimising, it is the other players who try to give Seat at least t tricks.
+		self.Seat, self.Maximise, self.Table, self.History = Seat, Maximise, {}, {}
+		self.MoveLists.clear()
+		Left = BitCount(self.Hands[0])
+		Lower, Upper = self.TrumpBounds(self.Dealt, Left)[:2]
+
+		while Lower < Upper:
+			Target = (Lower + Upper + 1) // 2
+
+			if self.Reaches(self.Dealt, self.Shape, self.Leader, 0, -1, -1, self.Leader, Target, Left)[0]:
+				Lower = Target
+			else:
+				Upper = Target - 1
+
+		return Lower
+
+	def Suits(self, Present, Best):
+		"""
+
+		For each suit, who holds its cards still in play (highest first, with the card Best marked as on the table)...
+		...and the cards themselves: the parts of the key that the patterns in Table are cut from.
+		(Each suit's part only depends on which of its cards are in play, so it is worked out once.)
+
+		"""
+
+		Suits = []
+
+		for Suit in range(4):
+			Mask = Present & SuitMasks[Suit]
+			Marked = Best if Best // 13 == Suit else -1
+
+			if (SuitKey := self.SuitKeys.get((Mask, Marked))) is None:
+				Cards = Rules.Cards(Mask | (1 << Marked) if Marked >= 0 else Mask)[::-1]
+
+				SuitKey = self.SuitKeys[Mask, Marked] = bytes(
+					self.PlayerNumber if card == Marked else self.Holders[card] for card in Cards), Cards
+
+			Suits.append(SuitKey)
+
+		return Suits
+
+	def Reaches(self, Present, Shape, Seat, Position, SuitLed, Best, Winner, Target, Left):
+		"""
+
+		Whether the side trying to give self.Seat tricks can give them at least Target of the Left tricks remaining...
+		...with Seat to play, Position cards of the trick played, Best winning it for Winner so far:
+		and the lowest card in each suit that the answer depended on.
+
+		"""
+
+		if Target <= 0:
+			return True, Nothing
+
+		if Target > Left:
+			return False, Nothing
+
+		if not Position:
+			Lower, Upper, Relevant = self.TrumpBounds(Present, Left)
+
+			if Lower >= Target:
+				return True, Relevant
+
+			if Upper < Target:
+				return False, Relevant
+
+			if not self.Maximise and 2 * (Left - Target + 1) - (Seat == self.Seat) <= Left:
+				if (Relevant := self.Ducks(Present, Seat, Left - Target + 1)) is not None:
+					return False, Relevant
+
+		(Clubs, ClubCards), (Diamonds, DiamondCards), (Spades, SpadeCards), (Hearts, HeartCards) = Suits = \
+			self.Suits(Present, Best)
+
+		Key = Shape, Seat, Position, SuitLed, Winner
+
+		# (Try each number of cards that mattered to earlier searches of this shape, with whoever holds them now.)
+		if Patterns := self.Table.get(Key):
+			for (C, D, S, H), Results in Patterns.items():
+				Bounds = Results.get((Clubs[:C], Diamonds[:D], Spades[:S], Hearts[:H]))
+
+				if Bounds and (Bounds[0] >= Target or Bounds[1] < Target):
+					return Bounds[0] >= Target, (ClubCards[C - 1] if C else 52, DiamondCards[D - 1] if D else 52,
+					                             SpadeCards[S - 1] if S else 52, HeartCards[H - 1] if H else 52)
+		else:
+			Patterns = self.Table[Key] = {}
+
+		Result, Relevant = self.Play(Present, Shape, Seat, Position, SuitLed, Best, Winner, Target, Left)
+
+		Depths = tuple(Depth(Cards, Relevant[Suit]) for Suit, (Holders, Cards) in enumerate(Suits))
+		Pattern = tuple(Holders[:Number] for (Holders, Cards), Number in zip(Suits, Depths))
+		Lower, Upper = (Target, Left) if Result else (0, Target - 1)
+
+		if (Results := Patterns.get(Depths)) is None:
+			Results = Patterns[Depths] = {}
+
+		if Old := Results.get(Pattern):
+			Lower, Upper = max(Lower, Old[0]), min(Upper, Old[1])
+
+		Results[Pattern] = Lower, Upper
+		return Result, Relevant
+
+	def Ducks(self, Present, Leader, Losses):
+		"""
+
+		Whether Seat can surely lose Losses more tricks, with cards that can't win them, whatever anyone else does:
+		if so, the lowest card in each suit that this depended on (and None if not).
+
+		A card of Seat's can't win a trick if another player holds a card of its suit above it every time it is led...
+		...which is sure if they hold enough cards of the suit, all above it, for every trick Seat might have to wait for...
+		...or if another player has only trumps left, and will trump it (a side suit) whenever it is played.
+
+		"""
+
+		Horizon = 2 * Losses - (Leader == self.Seat)
+		Trumps = SuitMasks[self.TrumpSuit]
+		Hand = Present & self.Hands[self.Seat]
+
+		# (Seat's own trumps can only be counted on to lose when there is no time for the suit to run out.)
+		if Losses > 1:
+			Hand &= ~Trumps
+
+		Free, Ranked = 0, 0
+
+		for Seat, Other in enumerate(self.Hands):
+			if Seat == self.Seat:
+				continue
+
+			Other &= Present
+
+			for Suit in range(4):
+				if not (Mine := Hand & SuitMasks[Suit]):
+					continue
+
+				if Theirs := Other & SuitMasks[Suit]:
+					if BitCount(Theirs) >= Horizon:
+						Ranked |= Mine & ((Theirs & -Theirs) - 1)
+
+				elif Suit != self.TrumpSuit and not Other & ~Trumps:
+					Free |= Mine
+
+		Ranked &= ~Free
+		Needed = Losses - BitCount(Free)
+
+		if Needed <= 0:
+			return Nothing
+
+		if BitCount(Ranked) < Needed:
+			return None
+
+		# (Only the cards used, highest first, need to be below the other player's.)
+		Relevant = Nothing
+
+		for i in range(Needed):
+			card = Ranked.bit_length() - 1
+			Ranked ^= 1 << card
+			Relevant = Lowered(Relevant, card // 13, card)
+
+		return Relevant
+
+	def TrumpBounds(self, Present, Left):
+		"""
+
+		Bounds on how many of the remaining tricks Seat wins, from the trumps that are sure to win tricks:
+		every trump played wins its trick unless a higher trump falls on it, and each trump only falls in one trick...
+		...so a player whose top n trumps are beaten by only m other trumps wins at least n - m tricks with them.
+		Seat wins at least as many as that, and at most the tricks that the other players aren't sure to win.
+		(The lowest trump that this depended on comes back too.)
+
+		"""
+
+		Trumps = Present & SuitMasks[self.TrumpSuit]
+		Lower, Others, Lowest = 0, 0, 52
+
+		for Seat, Hand in enumerate(self.Hands):
+			Mine = Hand & Trumps
+			Sure, Used, Number = 0, 52, 0
+
+			for card in reversed(Rules.Cards(Mine)):
+				Number += 1
+
+				if (Tricks := Number - BitCount((Trumps & ~Mine) >> (card + 1))) > Sure:
+					Sure, Used = Tricks, card
+
+			if Sure:
+				Lowest = min(Lowest, Used)
+
+				if Seat == self.Seat:
+					Lower = Sure
+				else:
+					Others += Sure
+
+		return Lower, Left - Others, Lowered(Nothing, self.TrumpSuit, Lowest) if Lowest < 52 else Nothing
+
+	def Play(self, Present, Shape, Seat, Position, SuitLed, Best, Winner, Target, Left):
+		"""Reaches, for a position that has to be searched: tries each of Seat's moves in turn"""
+
+		self.Nodes += 1
+
+		# (The clock is only looked at every thousand positions or so.)
+		if self.Deadline and not self.Nodes & 1023 and time() > self.Deadline:
+			raise TimeoutError('The deal was not solved by the deadline.')
+
+		Hand = Present & self.Hands[Seat]
+		Forcing = (Seat == self.Seat) == self.Maximise
+		Last = Position == self.PlayerNumber - 1
+		NextSeat = (Seat + 1) % self.PlayerNumber
+
+		# When maximising, Seat wants to win tricks, and the others want to beat Seat (but not each other).
+		# When minimising, Seat ducks under the others' cards, and they play low to leave Seat winning.
+		if self.Maximise and (Seat == self.Seat or not Position or Winner == self.Seat):
+			Order = 'Win'
+		elif Seat == self.Seat or Winner == self.Seat:
+			Order = 'Duck'
+		else:
+			Order = 'Under'
+
+		if (Moves := self.MoveLists.get((Hand, SuitLed, Best, Present, Order))) is None:
+			Moves = self.Moves(Hand, SuitLed, Best, Present, Order)
+
+		# (The side looking for a move that works tries the ones that have worked most often, deep in the search, first.)
+		if Forcing and len(Moves) > 1:
+			History = self.History
+			Moves = sorted(Moves, key=lambda Move: -History.get((Seat, Move[0]), 0))
+
+		Marker = self.PlayerNumber
+		Width = Marker + 1
+		All = Nothing
+
+		for card, Low in Moves:
+			Suit = card // 13 if SuitLed < 0 else SuitLed
+			Ranks = self.Ranks[Suit]
+
+			if Best < 0 or Ranks[card] > Ranks[Best]:
+				NewBest, NewWinner = card, Seat
+			else:
+				NewBest, NewWinner = Best, Winner
+
+			Remaining = Present ^ (1 << card)
+			NewShape = bytearray(Shape)
+			NewShape[card // 13 * Width + Seat] -= 1
+
+			if Best >= 0:
+				NewShape[Best // 13 * Width + Marker] -= 1
+
+			if not Last:
+				NewShape[NewBest // 13 * Width + Marker] += 1
+
+				Result, Relevant = self.Reaches(
+					Remaining, bytes(NewShape), NextSeat, Position + 1, Suit, NewBest, NewWinner, Target, Left)
+
+			elif Remaining:
+				Result, Relevant = self.Reaches(
+					Remaining, bytes(NewShape), NewWinner, 0, -1, -1, NewWinner, Target - (NewWinner == self.Seat),
+					Left - 1)
+			else:
+				Result, Relevant = Target <= (NewWinner == self.Seat), Nothing
+
+			# (Whether card beat Best depends on both of them.)
+			if Best >= 0 and card // 13 == Best // 13:
+				Relevant = Lowered(Relevant, card // 13, max(card, Best))
+
+			if Result == Forcing:
+				if Forcing:
+					self.History[Seat, card] = self.History.get((Seat, card), 0) + (1 << Left)
+
+				return Result, Relevant
+
+			All = tuple(map(min, All, Relevant))
+
+		# Every move failed: that depended on what every move depended on...
+		# ...and on the cards between each move tried and the low end of its run, which it stood for.
+		for card, Low in Moves:
+			if Low < card and card >= All[card // 13]:
+				All = Lowered(All, card // 13, Low)
+
+		return not Forcing, All
+
+	def Moves(self, Hand, SuitLed, Best, Present, Order):
+		"""
+
+		The cards worth trying, best first, each with the lowest card of its run: only the highest of each run of cards...
+		...that are equivalent, because no card still in play (in a hand or on the table) lies between them, is tried.
+		A player who wants to win the trick ('Win') tries winning as cheaply as possible first, then their lowest cards;
+		one who doesn't tries the cards that won't win first, highest first to 'Duck' and lowest first to stay 'Under'.
+		(The lists are kept in MoveLists, since the same hand faces the same choice in many lines of play.)
+
+		"""
+
+		Legal = Mask = LegalMask(Hand, SuitLed)
+
+		if Best >= 0:
+			Present |= 1 << Best
+
+		Moves = []
+		Low = -1
+
+		while Mask:
+			Lowest = Mask & -Mask
+			Mask ^= Lowest
+			card = Lowest.bit_length() - 1
+
+			if Low < 0:
+				Low = card
+
+			# (The next card up in the suit that is still in play: if it is this player's too, skip this one.)
+			Above = Present & SuitMasks[card // 13] & -(Lowest << 1)
+
+			if not Legal & Above & -Above:
+				Moves.append((card, Low))
+				Low = -1
+
+		if len(Moves) > 1:
+			if SuitLed < 0:
+				Moves.sort(key=lambda Move: self.Strengths[Move[0]], reverse=Order == 'Win')
+			else:
+				Ranks = self.Ranks[SuitLed]
+				Beaten = Ranks[Best]
+				Winners = sorted((Move for Move in Moves if Ranks[Move[0]] > Beaten), key=lambda Move: Ranks[Move[0]])
+
+				Losers = sorted((Move for Move in Moves if Ranks[Move[0]] <= Beaten), key=lambda Move: Values[Move[0]],
+				                reverse=Order == 'Duck')
+
+				Moves = Winners + Losers if Order == 'Win' else Losers + Winners
+
+		self.MoveLists[Hand, SuitLed, Best, Present, Order] = Moves
+		return Moves
+
+
+def SolveDeal(Hands, TrumpSuit, Leader=0):
+	"""Each seat's (MinTricks, MaxTricks) for a deal"""
+
+	return Solver(Hands, TrumpSuit, Leader).Bounds()
+
+
+def SavedRounds(Path, Limit=None):
+	"""
+
+	The rounds saved in a results database (most recent first), dealt again from their seeds, as the server dealt them:
+	each is a dict of the round's details, with Hands, TrumpSuit and Leader for Solver, and the players' Bids and Tricks.
+	(Rounds saved before seeds were can't be dealt again, and are left out.)
+
+	"""
+
+	# (Straight from the database, rather than through Results.ResultsStore, so that this doesn't need the server.)
+	with closing(sqlite3.connect(Path)) as db:
+		db.row_factory = sqlite3.Row
+
+		Rows = db.execute(
+			'SELECT TableID, Started, RoundNumber, CardNumber, Seat, Player, Bid, Tricks, Seed FROM Rounds '
+			'WHERE Seed IS NOT NULL ORDER BY Finished DESC, TableID, Started, RoundNumber, Seat').fetchall()
+
+	Rounds = {}
+
+	for Row in Rows:
+		Round = Rounds.setdefault((Row['TableID'], Row['Started'], Row['RoundNumber']), dict(Row, Players=[]))
+		Round['Players'].append((Row['Player'], Row['Bid'], Row['Tricks']))
+
+	Rounds = list(Rounds.values())[:Limit]
+
+	for Round in Rounds:
+		Pack = Rules.NewPack(Random(Round['Seed']))
+		Round['TrumpSuit'] = Pack.pop() // 13
+		Round['Hands'] = [Rules.Bitboard(Pack.pop() for i in range(Round['CardNumber'])) for Player in Round['Players']]
+		Round['Leader'] = (Round['RoundNumber'] - 1) % len(Round['Players'])
+
+	return Rounds
+
+
+if __name__ == '__main__':
+	if len(sys.argv) < 2:
+		sys.exit('Usage: Solver.py <results database> [rounds]')
+
+	for Round in SavedRounds(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else None):
+		Start = perf_counter()
+		Bounds = SolveDeal(Round['Hands'], Round['TrumpSuit'], Round['Leader'])
+
+		print(f"Table {Round['TableID']}, round {Round['RoundNumber']} ({Round['CardNumber']} cards, "
+		      f"{Rules.Suits[Round['TrumpSuit']]} trumps), solved in {perf_counter() - Start:.2f}s:")
+
+		for (Player, Bid, Tricks), (Lowest, Highest) in zip(Round['Players'], Bounds):
+			print(f'  {Player:<24} bid {Bid}, won {Tricks}: could make sure of {Highest}, and of no more than {Lowest}')
@@ -0,0 +1,987 @@
+"""
+
+Two classes for hosting games on the server:
+a Table (a single game and the connections of its players)...
+...and a Lobby, which seats incoming connections at tables when the server is running headlessly.
+
+"""
+
+import io, os, socket, pickle, secrets, traceback, zlib
+
+from collections import deque
+from random import Random
+from threading import Event, Lock, Thread
+from tempfile import gettempdir
+from time import monotonic, time
+
+from Game import Game, TableClosed, Operations
+from Player import Player
+from EventLog import EventLog, LogWriter
+from Results import ResultsStore
+from Accounting import Meter, CPUTimer, Footprint
+from Clock import GetTime
+from Admission import LoadMonitor, RateLimiter
+from Scheduler import Scheduler
+
+
+class Snapshot(object):
+	"""
+
+	A copy of a table's game as it was at the end of one of the writer's steps, which is never changed once published.
+	Readers can send the already-pickled payload as it is, or decode their own copy of the game.
+
+	"""
+
+	__slots__ = 'Version', 'Payload', 'Decoded'
+
+	def __init__(self, Version, Payload):
+		self.Version = Version
+		self.Payload = Payload
+		self.Decoded = None
+
+	def Game(self):
+		if self.Decoded is None:
+			self.Decoded = pickle.loads(self.Payload)
+
+		return self.Decoded
+
+
+class StoredSnapshot(object):
+	"""
+
+	The snapshot of a hibernating table, which is kept on disk (compressed) rather than in memory.
+	Readers use it exactly like a Snapshot: the payload is read back from the disk each time it is needed.
+
+	"""
+
+	__slots__ = 'Version', 'Path'
+
+	def __init__(self, Version, Path):
+		self.Version = Version
+		self.Path = Path
+
+	@property
+	def Payload(self):
+		with open(self.Path, 'rb') as f:
+			return zlib.decompress(f.read())
+
+	def Game(self):
+		return pickle.loads(self.Payload)
+
+
+class Freezer(pickle.Pickler):
+	"""
+
+	Pickles a hibernating table's game without its players, who are kept in memory instead...
+	...so that the threads handling the players' connections can go on using the same Player objects.
+
+	"""
+
+	def __init__(self, File, Players):
+		super().__init__(File)
+		self.Players = Players
+
+	def persistent_id(self, Object):
+		if not isinstance(Object, Player):
+			return None
+
+		if Object not in self.Players:
+			self.Players.append(Object)
+
+		return self.Players.index(Object)
+
+
+class Thawer(pickle.Unpickler):
+	"""Unpickles a game pickled by a Freezer, putting the players it left out back in"""
+
+	def __init__(self, File, Players):
+		super().__init__(File)
+		self.Players = Players
+
+	def persistent_load(self, ID):
+		return self.Players[ID]
+
+
+class Command(object):
+	"""A change to be made to a table by the table's writer, on behalf of another thread"""
+
+	__slots__ = 'Function', 'args', 'Reply', 'Result', 'Error', 'Snapshot', 'Done'
+
+	def __init__(self, Function, args, Reply):
+		self.Function = Function
+		self.args = args
+		self.Reply = Reply
+		self.Result = self.Error = self.Snapshot = None
+		self.Done = Event()
+
+	def Run(self):
+		try:
+			self.Result = self.Function(*self.args)
+		except Exception as e:
+			self.Error = e
+
+	def Finish(self, snapshot=None, Error=None):
+		self.Snapshot = snapshot
+		self.Error = self.Error or Error
+		self.Done.set()
+
+
+class Table(object):
+	"""
+
+	Class representing a single game of Knock hosted by the server, together with its players' connections.
+	A table doesn't have a thread of its own: it is stepped by a Scheduler whenever something happens at it.
+
+	The table's writer (whichever scheduler thread is stepping it) is the only thread that touches the game.
+	Other threads have to Submit() their changes, which are queued up and made by the writer in order...
+	...and can only read the game through the latest Snapshot that the writer has published.
+
+	Every change the writer makes to the game is an event: a call to one of the methods in the 'Events' section below.
+	If the table has an EventLog, the events are logged, so that the table can be rebuilt if the server dies.
+
+	"""
+
+	__slots__ = 'TableID', 'PlayerNumber', 'Config', 'game', 'Snapshot', 'Connections', 'Commands', 'lock', \
+	            'Playing', 'Runs', 'Crashes', 'Finished', 'Restart', 'Scheduler', 'OnFinished', 'FirstHumanArrived', \
+	            'Log', 'Sequence', 'Pending', 'Addresses', 'Tokens', 'Away', 'Store', 'meter', 'LastActive', 'Frozen', \
+	            'HandedOver'
+
+	def __init__(self, TableID, PlayerNumber, Config, Log=None, Store=None, State=None):
+		self.TableID = TableID
+		self.PlayerNumber = PlayerNumber
+		self.Config = Config
+		self.Commands = deque()
+		self.lock = Lock()
+		self.Runs = 0
+		self.Crashes = 0
+		self.Finished = False
+		self.Restart = Config.RestartTables
+		self.Scheduler = None
+		self.OnFinished = None
+		self.Snapshot = Snapshot(0, b'')
+		self.Log = Log
+		self.Store = Store
+		self.meter = Meter()
+		self.LastActive = monotonic()
+		self.Frozen = None
+		self.HandedOver = False
+		self.Sequence = 0
+		self.Pending = []
+		self.Away = {}
+
+		# (A table can be given its State by another server process that is handing its tables over to this one.)
+		if State:
+			self.Restore(State)
+		elif not (Log and self.Recover()):
+			self.NewGame()
+
+		self.Publish()
+
+	def Recover(self):
+		"""
+
+		Rebuild the table from its snapshot and the events logged since.
+		Returns False if there is nothing to recover, or if the log doesn't replay the way the game went.
+
+		"""
+
+		StartTime = monotonic()
+		State, Events = self.Log.Load()
+
+		if State is None:
+			return False
+
+		self.Restore(State)
+
+		# Events that failed when they were first made are logged as failures, and should fail again when replayed.
+		# If any event doesn't go the same way as it did the first time, the log can't be trusted to rebuild the game.
+		for Number, Event in enumerate(Events):
+			Kind, *args = Event[1:] if (Failed := Event[0] == 'Failed') else Event
+
+			try:
+				getattr(self, Kind)(*args)
+			except Exception:
+				if Failed:
+					continue
+
+				print(traceback.format_exc())
+			else:
+				if not Failed:
+					continue
+
+			print(f"Event {self.Sequence + Number} ({Kind}) at table {self.TableID} didn't replay the way it first happened, "
+			      f"so the table can't be recovered from its log; starting a new game there instead at {GetTime()}.\n")
+
+			self.Crashes += 1
+			return False
+
+		self.Sequence += len(Events)
+
+		# The players' connections didn't survive, so their seats are kept for them until they reconnect...
+		# ...as long as they can show the resume token their seat was given (see Welcome).
+		self.Away = {player.playerindex: self.Tokens.get(player.playerindex) for player in self.Humans()}
+
+		print(f'Recovered table {self.TableID} from {len(Events)} logged event(s) '
+		      f'in {(monotonic() - StartTime) * 1000:.1f}ms at {GetTime()}.\n')
+
+		return True
+
+	def Restore(self, State):
+		"""Put the table back as it was when State was saved (see Checkpoint and HandOver)"""
+
+		for name in ('game', 'Playing', 'Runs', 'Crashes', 'Addresses', 'Sequence'):
+			setattr(self, name, State[name])
+
+		self.Tokens = State.get('Tokens', {})
+		self.Away = State.get('Away', {})
+		self.PlayerNumber = self.game.Attributes.Tournament['PlayerNumber']
+		self.Connections = {}
+		self.FirstHumanArrived = None
+
+	def NewGame(self):
+		Config = self.Config
+		Timeouts = {'Bid': Config.BidTimeout, 'Play': Config.PlayTimeout, 'Ack': Config.AckTimeout}
+		Seed = self.GameSeed()
+		self.game = Game(self.PlayerNumber, Config.BotCardNumber, Timeouts, Fast=(Config.Speed == 'fast'), Seed=Seed)
+		self.Connections = {}
+		self.Addresses = {}
+		self.Tokens = {}
+		self.Away = {}
+		self.Playing = False
+		self.FirstHumanArrived = None
+
+		# Bots take the last seats at the table, so that a human (if there is one) decides the starting card number.
+		for playerindex in range(max(0, self.PlayerNumber - Config.BotSeats), self.PlayerNumber):
+			self.game.AddBot(playerindex)
+
+	def GameSeed(self):
+		"""
+
+		The seed for the table's next game (see Game.Seed), if the server was given one: otherwise the game picks its own.
+		With duplicate deals, every table's first game has the same seed, every table's second game has the same seed...
+
+		"""
+
+		if not (Seed := self.Config.Seed):
+			return None
+
+		Table = 'all' if self.Config.DuplicateDeals else self.TableID
+		return Random(f'{Seed}/{Table}/{self.Runs}').getrandbits(63)
+
+	def Seated(self):
+		"""How many players are at the table (a hibernating table is always full, as only games in play hibernate)"""
+
+		return len(game.Players) if (game := self.game) else self.PlayerNumber
+
+	def Humans(self):
+		return [player for player in self.game.Players if not player.Bot]
+
+	def HasFreeSeat(self):
+		return not (self.Finished or self.Playing) and len(self.game.Players) < self.PlayerNumber
+
+	def Expects(self, Token):
+		"""Whether Token is the resume token of a player who was at this table before the server restarted"""
+
+		return not self.Finished and bool(Token) and Token in self.Away.values()
+
+	def Submit(self, Function, *args, Reply=False, Wait=True):
+		"""
+
+		Have the table's writer call Function(*args), blocking until it has (unless Wait is False).
+		Returns the result, plus the first snapshot published after the change was made if Reply is True.
+		Raises TableClosed if the table has closed for good.
+
+		"""
+
+		command = Command(Function, args, Reply)
+
+		with self.lock:
+			if self.Finished:
+				raise TableClosed('The table has closed.')
+
+			self.Commands.append(command)
+
+		self.Wake()
+
+		if not Wait:
+			return None
+
+		command.Done.wait()
+
+		if command.Error:
+			raise command.Error
+
+		return (command.Result, command.Snapshot) if Reply else command.Result
+
+	def Seat(self, conn, addr):
+		"""Seat a new connection at this table, returning the new player (or None if the table is full)"""
+
+		try:
+			return self.Submit(self.SeatPlayer, conn, addr)
+		except TableClosed:
+			return None
+
+	def SeatPlayer(self, conn, addr):
+		if not self.HasFreeSeat():
+			return None
+
+		player = self.Record('AddHuman', addr[0], secrets.token_hex(16))
+		self.Connections[conn] = addr, player
+		return player
+
+	def Resume(self, conn, addr, Token):
+		"""Give a reconnecting player back their seat, returning their player (or None if Token isn't one expected)"""
+
+		try:
+			return self.Submit(self.ResumePlayer, conn, addr, Token)
+		except TableClosed:
+			return None
+
+	def ResumePlayer(self, conn, addr, Token):
+		if not Token or (playerindex := next((i for i, Theirs in self.Away.items() if Theirs == Token), None)) is None:
+			return None
+
+		del self.Away[playerindex]
+		player = self.PlayerAt(playerindex)
+		self.Connections[conn] = addr, player
+		return player
+
+	def Reattach(self, conn, addr, Position):
+		"""Attach a connection handed over by another server process to the player it belonged to"""
+
+		player = self.game.Players[Position]
+		self.Connections[conn] = addr, player
+		return player
+
+	def HandOver(self):
+		"""
+
+		Stop playing at this table, so that another server process can take it over.
+		Returns the table's state, and its players' connections along with each player's position at the table.
+
+		"""
+
+		with self.lock:
+			self.Finished = self.HandedOver = True
+
+		self.Scheduler.Remove(self)
+
+		# (The writer has woken the table up to run this, and the new server hibernates it under its own name.)
+		self.RemoveHibernationFiles()
+
+		State = {
+			'Sequence': self.Sequence, 'game': self.game, 'Playing': self.Playing, 'Runs': self.Runs,
+			'Crashes': self.Crashes, 'Addresses': self.Addresses, 'Tokens': self.Tokens, 'Away': self.Away
+		}
+
+		Players = self.game.Players
+		return State, [(conn, addr, Players.index(player)) for conn, (addr, player) in self.Connections.items()
+		               if player in Players]
+
+	def Welcome(self, player):
+		"""
+
+		The first message sent to a newly seated client.
+		It includes the seat's resume token, which the client has to show to get the seat back if the server restarts.
+
+		"""
+
+		return pickle.dumps({'game': self.game, 'player': player, 'playerindex': player.playerindex,
+		                     'ResumeToken': self.Tokens.get(player.playerindex)})
+
+	def ClientMessage(self, player, MessageType, Message):
+		return self.Record('Message', self.game.Players.index(player), MessageType, Message)
+
+	def Unseat(self, player, conn):
+		try:
+			self.Submit(self.UnseatPlayer, player, conn)
+		except TableClosed:
+			pass
+
+	def UnseatPlayer(self, player, conn):
+		"""
+
+		If a player leaves before the game starts, their seat is freed.
+		If they leave mid-game, a bot takes over their seat (if configured to), or else the table closes.
+
+		"""
+
+		self.Connections.pop(conn, None)
+
+		# (A bot may already have taken over this player's seat.)
+		if player in self.game.Players and not player.Bot:
+			if self.Playing and self.Config.BotTakeover and len(self.Humans()) > 1:
+				print(f'A bot has taken over from {player} at table {self.TableID} at {GetTime()}.\n')
+				self.Record('BecomeBot', player.playerindex)
+			else:
+				self.Record('RemovePlayer', player.playerindex, self.Playing)
+
+	def PlayerAt(self, playerindex):
+		return next(player for player in self.game.Players if player.playerindex == playerindex)
+
+	def Wake(self):
+		if self.Scheduler:
+			self.Scheduler.Wake(self)
+
+	def Quorate(self):
+		Players = self.game.Players
+		return len(Players) == self.PlayerNumber and all(isinstance(player.name, str) for player in Players)
+
+	def Start(self, scheduler, OnFinished=None):
+		"""Have the scheduler play at this table until it closes for good; OnFinished(table) is called when it does"""
+
+		self.Scheduler = scheduler
+		self.OnFinished = OnFinished
+		self.Checkpoint()
+		scheduler.Add(self)
+
+	def Play(self):
+		"""Play a single game at this table in the background, returning an Event that is set once the game is over"""
+
+		Finished, scheduler = Event(), Scheduler()
+		self.Restart = False
+
+		# (The scheduler is only playing at this table, so its thread can end along with the game.)
+		def OnFinished(table):
+			scheduler.Stop()
+			Finished.set()
+
+		self.Start(scheduler, OnFinished)
+		return Finished
+
+	def Step(self):
+		"""Make the changes other threads have asked for, then move the game on as far as it can go"""
+
+		Commands = []
+
+		with CPUTimer(self.meter.Step):
+			if self.game is None:
+				self.Thaw()
+
+			Version = self.Snapshot.Version
+
+			while self.Commands:
+				(command := self.Commands.popleft()).Run()
+				Commands.append(command)
+
+			try:
+				Wait = self.PlayOn()
+			finally:
+				self.Commit(Commands)
+
+			if Commands or self.Snapshot.Version != Version:
+				self.LastActive = monotonic()
+
+			return self.HibernateWhenIdle(Wait)
+
+	def Commit(self, Commands):
+		"""
+
+		Publish the game as it is at the end of a step, and log the events that happened in it.
+		Every client that changed the game in this step gets the same snapshot back, once the events are on disk.
+
+		"""
+
+		Version = self.Snapshot.Version
+		snapshot = self.Publish()
+		Events, self.Pending = self.Pending, []
+		Reply = lambda: [command.Finish(snapshot) for command in Commands]
+
+		# (Moving the game on without changing it is not worth logging.)
+		if not Events or (snapshot.Version == Version and all(Event[:1] == ('Advance',) for Event in Events)):
+			self.Sequence -= len(Events)
+			return Reply()
+
+		self.Log.Append(self.Sequence - len(Events), Events, Callback=Reply)
+
+		if self.Log.Events >= self.Config.SnapshotEvery:
+			self.Checkpoint()
+
+	def Publish(self):
+		"""Replace the table's snapshot with a new version, if the game has changed since the last one was published"""
+
+		if (Payload := pickle.dumps(self.game)) != self.Snapshot.Payload:
+			# (Assigning the attribute is atomic, so readers always see either the old snapshot or the new one.)
+			self.Snapshot = Snapshot(self.Snapshot.Version + 1, Payload)
+
+		return self.Snapshot
+
+	def Checkpoint(self):
+		"""Replace the table's snapshot on disk, which also empties its log"""
+
+		if self.Log and not self.Finished:
+			self.Log.Snapshot({
+				'Sequence': self.Sequence, 'game': self.game, 'Playing': self.Playing, 'Runs': self.Runs,
+				'Crashes': self.Crashes, 'Addresses': self.Addresses, 'Tokens': self.Tokens
+			})
+
+	def Usage(self):
+		"""
+
+		What the table has cost the server so far (see Accounting.Meter), plus how much memory its game takes up.
+		Can be called from any thread: the memory is measured on a copy of the game from the latest snapshot.
+
+		"""
+
+		snapshot = self.Snapshot
+		game = pickle.loads(Payload := snapshot.Payload)
+		Bytes, Objects = Footprint(game)
+
+		return {
+			**self.meter.Usage(),
+			'TableID': self.TableID,
+			'Players': len(game.Players),
+			'CardNumber': game.Attributes.Game['StartCardNumber'],
+			'Memory': sum(Bytes.values()),
+			'Objects': {Name: (Objects[Name], Bytes[Name]) for Name in ('Game', 'Player', 'Card')},
+			'SnapshotBytes': len(Payload),
+			'Hibernating': isinstance(snapshot, StoredSnapshot)
+		}
+
+	def HibernateWhenIdle(self, Wait):
+		"""
+
+		If nothing has happened at a table in play for Config.HibernateAfter seconds, it is hibernated.
+		Returns how long until the table next needs to be stepped (either to move the game on, or to hibernate it).
+
+		"""
+
+		if not (After := self.Config.HibernateAfter) or self.game is None or self.Finished or not self.Playing:
+			return Wait
+
+		if (Remaining := After - (monotonic() - self.LastActive)) > 0:
+			return Remaining if Wait is None else min(Wait, Remaining)
+
+		self.Hibernate()
+		return Wait
+
+	def HibernationPath(self, Kind):
+		return os.path.join(self.Config.HibernateDirectory or gettempdir(),
+		                    f'knock-{os.getpid()}-table-{self.TableID}.{Kind}')
+
+	def Hibernate(self):
+		"""
+
+		Swap the table's game (apart from its players) out to disk, compressed, to free up the memory it takes up.
+		Clients can still read the game through the table's snapshot, and any change to the table wakes it up again.
+
+		"""
+
+		Frozen, Players = io.BytesIO(), []
+		Freezer(Frozen, Players).dump(self.game)
+
+		for Kind, Data in (('game', Frozen.getvalue()), ('snapshot', self.Snapshot.Payload)):
+			with open(Temporary := f'{self.HibernationPath(Kind)}.tmp', 'wb') as f:
+				f.write(zlib.compress(Data))
+
+			# (A reader may still be reading a snapshot left over from the last time the table hibernated.)
+			os.replace(Temporary, self.HibernationPath(Kind))
+
+		self.Snapshot = StoredSnapshot(self.Snapshot.Version, self.HibernationPath('snapshot'))
+		self.Frozen = Players
+		self.game = None
+
+	def RemoveHibernationFiles(self):
+		for Kind in ('game', 'snapshot'):
+			try:
+				os.remove(self.HibernationPath(Kind))
+			except FileNotFoundError:
+				pass
+
+	def Thaw(self):
+		"""Wake a hibernating table up, by loading its game back from disk"""
+
+		with open(self.HibernationPath('game'), 'rb') as f:
+			self.game = Thawer(io.BytesIO(zlib.decompress(f.read())), self.Frozen).load()
+
+		self.Snapshot = Snapshot(self.Snapshot.Version, self.Snapshot.Payload)
+		self.Frozen = None
+
+	def Record(self, Kind, *args):
+		"""Make a change to the game by calling one of the event methods below, logging the event if need be"""
+
+		Failed = True
+
+		try:
+			Result = getattr(self, Kind)(*args)
+			Failed = False
+			return Result
+		finally:
+			# (Events that fail are logged too, as they may have changed the game before failing...
+			# ...but marked as failures, so that replaying them is expected to fail in the same way: see Recover.)
+			if self.Log:
+				self.Pending.append(('Failed', Kind, *args) if Failed else (Kind, *args))
+				self.Sequence += 1
+
+	# Events: the only methods that change the game (apart from NewGame), always called through Record().
+	# Given the same game, the same events always have the same result, so they can be replayed from the log.
+
+	def AddHuman(self, IP, Token=None):
+		player = self.game.AddPlayer()
+		self.Addresses[player.playerindex] = IP
+		self.Tokens[player.playerindex] = Token
+		return player
+
+	def BecomeBot(self, playerindex):
+		return self.PlayerAt(playerindex).BecomeBot()
+
+	def RemovePlayer(self, playerindex, EndGame):
+		self.game.RemovePlayer(self.PlayerAt(playerindex), EndGame)
+
+	def FillWithBots(self):
+		while len(self.game.Players) < self.PlayerNumber:
+			self.game.AddBot()
+
+	def StartPlaying(self):
+		self.Playing = True
+
+	def Message(self, playerindex, MessageType, Message):
+		Info = {'Message': Message,
+		        'playerindex': playerindex}
+
+		return Operations[MessageType](self.game, Info)
+
+	def Advance(self, Now):
+		return self.game.Advance(Now)
+
+	def CloseGame(self):
+		self.Finished = True
+		self.game.Close()
+
+	# The remaining functions are only called by the writer, when stepping the table.
+
+	def PlayOn(self):
+		"""
+
+		Wait for the table to fill up, then play until a player leaves the table.
+		Returns None, or the number of seconds until the table next needs to be stepped.
+
+		"""
+
+		# (Once the table has been handed over to another server process, this one mustn't touch it.)
+		if self.HandedOver:
+			return None
+
+		if not (self.Playing or self.Finished):
+			if not self.Quorate():
+				return self.WaitForBots()
+
+			self.Record('StartPlaying')
+			print(f'All players have joined table {self.TableID}; starting the game at {GetTime()}.\n')
+
+		if self.Finished and not self.Playing:
+			return self.EndRun()
+
+		try:
+			return self.Record('Advance', time())
+		except TableClosed:
+			print(f'A player left table {self.TableID} at {GetTime()}; the game has ended.\n')
+		except:
+			print(traceback.format_exc())
+			print(f'Exception occurred on table {self.TableID} at {GetTime()}')
+			self.Crashes += 1
+		finally:
+			self.SaveResults()
+
+		return self.EndRun()
+
+	def SaveResults(self):
+		"""Hand the results of any rounds or games that have just finished over to the results store"""
+
+		Results, self.game.Results = self.game.Results, []
+
+		# (After a crash, results that were saved before are replayed from the log, but the store ignores them.)
+		if Results and self.Store:
+			self.Store.Save(self.TableID, Results)
+
+	def WaitForBots(self):
+		"""If humans have been waiting for long enough, bots can fill the empty seats."""
+
+		if not (FillAfter := self.Config.BotFillAfter):
+			return None
+
+		if not ((Humans := self.Humans()) and all(isinstance(human.name, str) for human in Humans)):
+			self.FirstHumanArrived = None
+			return None
+
+		self.FirstHumanArrived = self.FirstHumanArrived or monotonic()
+
+		if (Remaining := FillAfter - (monotonic() - self.FirstHumanArrived)) > 0:
+			return Remaining
+
+		self.Record('FillWithBots')
+		return 0
+
+	def EndRun(self):
+		"""Reopen the table for new players once its game has ended (if configured to), or else close it for good."""
+
+		self.CloseConnections()
+		Config = self.Config
+
+		if self.Playing:
+			self.Runs += 1
+
+		if self.Restart and not self.Finished and not (Config.MaxTableRuns and self.Runs >= Config.MaxTableRuns):
+			self.NewGame()
+			self.Checkpoint()
+			print(f'Table {self.TableID} has reopened for new players at {GetTime()}.\n')
+			return None
+
+		with self.lock:
+			self.Finished = True
+			Leftovers = list(self.Commands)
+			self.Commands.clear()
+
+		for command in Leftovers:
+			command.Finish(Error=TableClosed('The table has closed.'))
+
+		if self.Log:
+			self.Log.Delete()
+
+		self.RemoveHibernationFiles()
+		self.Scheduler.Remove(self)
+
+		if self.OnFinished:
+			self.OnFinished(self)
+
+		return None
+
+	def CloseConnections(self):
+		"""
+
+		Shut the players' connections down, which wakes up the threads handling them...
+		...and leaves each thread to close its own connection (see KnockServer.ThreadedClient).
+
+		"""
+
+		Connections, self.Connections = list(self.Connections), {}
+
+		for conn in Connections:
+			try:
+				conn.shutdown(socket.SHUT_RDWR)
+			except OSError:
+				pass
+
+	def Close(self):
+		"""Close the table for good, ending any game in progress"""
+
+		try:
+			self.Submit(self.Record, 'CloseGame', Wait=False)
+		except TableClosed:
+			pass
+
+
+class Lobby(object):
+	"""Class for seating incoming connections at tables, when the server is running headlessly."""
+
+	__slots__ = 'Config', 'Tables', 'lock', 'Finished', 'ShuttingDown', 'ClientFunction', 'Connections', 'Load', \
+	            'Scheduler', 'Writer', 'Store', 'Handover', 'HandedOver', 'Adopted'
+
+	def __init__(self, Config, ClientFunction, Inherited=()):
+		"""Inherited: the tables handed over by another server process, if this one is taking over from it"""
+
+		self.Config = Config
+		self.ClientFunction = ClientFunction
+		self.lock = Lock()
+		self.Finished = Event()
+		self.ShuttingDown = False
+		self.Connections = 0
+		self.Load = LoadMonitor(Config.MaxLag, Config.MaxCPU)
+		self.Scheduler = Scheduler(Config.SchedulerThreads)
+		self.Tables = []
+		self.Writer = None
+		self.Store = ResultsStore(Config.ResultsDatabase) if Config.ResultsDatabase else None
+		self.Handover = None
+		self.HandedOver = False
+		self.Adopted = []
+		TableNumber = Config.Tables
+
+		if Config.LogDirectory:
+			os.makedirs(Config.LogDirectory, exist_ok=True)
+			self.Writer = LogWriter()
+
+			# Every table that still has a log left over from the last time the server ran is reopened.
+			for Name in os.listdir(Config.LogDirectory):
+				if not Inherited and Name.startswith('table-') and Name.endswith('.snapshot'):
+					TableNumber = max(TableNumber, int(Name[6:-9]) + 1)
+
+		for TableID, State, Connections in Inherited:
+			self.OpenTable(TableID, State, Connections)
+
+		while len(self.Tables) < TableNumber:
+			self.OpenTable()
+
+		print(f'{len(self.Tables)} table(s) of {Config.PlayerNumber} players open at {GetTime()}.\n')
+
+	def OpenTable(self, TableID=None, State=None, Connections=()):
+		if TableID is None:
+			TableID = max((table.TableID for table in self.Tables), default=-1) + 1
+
+		Log = EventLog(self.Writer, self.Config.LogDirectory, TableID) if self.Writer else None
+		table = Table(TableID, self.Config.PlayerNumber, self.Config, Log, self.Store, State)
+		self.Tables.append(table)
+
+		# (Handed-over connections are reattached before the game can move on, so each finds its player where it left it.)
+		for conn, addr, Position in Connections:
+			self.Adopted.append((table, table.Reattach(conn, addr, Position), conn, addr))
+
+		table.Start(self.Scheduler, self.TableFinished)
+		return table
+
+	def CanOpenTable(self):
+		OpenTables = sum(1 for table in self.Tables if not table.Finished)
+		return not self.ShuttingDown and OpenTables < self.Config.MaxTables
+
+	def Admit(self, addr, Token):
+		"""
+
+		To be used as the Admit function for the server's Network object:
+		returns a (reason, retry-after) tuple if a new connection should be turned away, otherwise None.
+
+		Under heavy load, we would rather turn away new players than slow down the games already in progress.
+
+		"""
+
+		Config = self.Config
+
+		with self.lock:
+			if Config.MaxConnections and self.Connections >= Config.MaxConnections:
+				Reason = 'the server has reached its maximum number of connections'
+			elif not (Reason := self.Load.Overloaded()):
+				if any(table.HasFreeSeat() or table.Expects(Token) for table in self.Tables) or self.CanOpenTable():
+					return None
+
+				Reason = 'every table is full'
+
+		return Reason, Config.RetryAfter
+
+	def Seat(self, Server, ConnectionNumber, conn, addr, Token):
+		"""
+
+		To be used as the ThreadedFunction for the server's Network object:
+		seats the connection at the fullest table with a free seat, then hands it over to ClientFunction.
+
+		"""
+
+		player = None
+
+		try:
+			# (Seating a connection waits for the table's writer, so only picking the tables is done under the lock.)
+			with self.lock:
+				# Players who were at a table before the server restarted get their old seat back (given its token).
+				Returning = [table for table in self.Tables if table.Expects(Token)]
+				Fullest = sorted(self.Tables, key=Table.Seated, reverse=True)
+
+			for table in Returning + Fullest:
+				if player := (table.Resume(conn, addr, Token) if table in Returning else table.Seat(conn, addr)):
+					break
+			else:
+				with self.lock:
+					table = self.OpenTable() if self.CanOpenTable() else None
+
+				if table:
+					player = table.Seat(conn, addr)
+					print(f'Opened table {table.TableID} at {GetTime()}.\n')
+
+			if player:
+				with self.lock:
+					self.Connections += 1
+
+			if not player:
+				print(f'No free seats for the connection from {addr} at {GetTime()}; declining it.\n')
+				Message = {'game': None, 'player': None, 'playerindex': -1,
+				           'Reason': 'every table is full', 'RetryAfter': self.Config.RetryAfter}
+				Server.send(Message, conn=conn)
+				Server.CloseConnection(conn)
+				return None
+		finally:
+			if not player:
+				Server.ClientThreads.pop(conn, None)
+
+		print(f'Connection from {addr} seated at table {table.TableID} at {GetTime()}.\n')
+		self.Host(Server, table, player, conn, addr)
+
+	def Host(self, Server, table, player, conn, addr, Welcome=True):
+		"""Hand a seated connection over to ClientFunction, for as long as it stays connected"""
+
+		try:
+			self.ClientFunction(Server, table, player, conn, addr, RateLimiter(self.Config.MaxMessageRate),
+			                    Handover=self.Handover, Welcome=Welcome)
+		finally:
+			Server.ClientThreads.pop(conn, None)
+
+			with self.lock:
+				self.Connections -= 1
+
+	def Adopt(self, Server):
+		"""Start handling the connections handed over by another server process, now that this one has a Server"""
+
+		for table, player, conn, addr in self.Adopted:
+			with self.lock:
+				self.Connections += 1
+
+			Server.ClientThreads[conn] = Thread(target=self.Host, args=(Server, table, player, conn, addr, False))
+			Server.ClientThreads[conn].start()
+
+		self.Adopted = []
+
+	def HandOver(self):
+		"""Hand every open table over to another server process (see Table.HandOver), once nothing else is using them"""
+
+		Tables = []
+
+		for table in self.Tables:
+			try:
+				Tables.append((table.TableID, *table.Submit(table.HandOver)))
+			except TableClosed:
+				pass
+
+		# (The new server mustn't start on the tables' logs and results before this one has finished writing them.)
+		if self.Writer:
+			self.Writer.Flush()
+
+		if self.Store:
+			self.Store.Flush()
+
+		return Tables
+
+	def Report(self):
+		"""A summary of what each open table is costing the server, one line per table"""
+
+		Lines = [f'Resource usage at {GetTime()}:']
+
+		for table in self.Tables:
+			if table.Finished:
+				continue
+
+			Usage = table.Usage()
+			Seats = ', '.join(f'{Seat}: {In / 1024:.1f}K/{Out / 1024:.1f}K' for Seat, (In, Out) in Usage['Bytes'].items())
+			Objects = ', '.join(f'{Count} {Name}' for Name, (Count, Size) in Usage['Objects'].items())
+
+			Lines.append(
+				f"Table {table.TableID}: {Usage['Players']} players, {Usage['CardNumber']} cards | "
+				f"CPU {Usage['GameCPU']:.3f}s game + {Usage['HandlerCPU']:.3f}s handlers ({Usage['CPUShare']:.2%} of a core) | "
+				f"{Usage['Messages']} messages ({Usage['MessageRate']:.1f}/s) | "
+				f"memory {'(hibernating) ' if Usage['Hibernating'] else ''}{Usage['Memory'] / 1024:.1f}K ({Objects}), "
+				f"snapshot {Usage['SnapshotBytes'] / 1024:.1f}K | "
+				f'bytes in/out by seat: {Seats or "none"}'
+			)
+
+		return '\n'.join(Lines) + '\n'
+
+	def TableFinished(self, table):
+		print(f'Table {table.TableID} has closed for good after {table.Runs} run(s).\n')
+
+		if all(table.Finished for table in self.Tables):
+			self.Finished.set()
+
+	def Shutdown(self):
+		self.ShuttingDown = True
+
+		for table in self.Tables:
+			table.Close()
+
+	def ExitStatus(self):
+		"""0 if every table ran cleanly, 1 if any game ended because of an unexpected error"""
+
+		return 1 if any(table.Crashes for table in self.Tables) else 0
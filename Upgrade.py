@@ -0,0 +1,148 @@
+"""
+
+Class for upgrading a headless server without ending any games or disconnecting any players:
+a new server process asks the old one (over a Unix socket) to hand over its listening socket, its players' connections...
+...and the state of its tables, then carries on where the old one left off.
+
+"""
+
+import os, pickle, select, socket, struct
+
+from threading import Thread
+from time import sleep
+
+from EventLog import Record
+from Clock import GetTime
+
+
+def ReceiveExactly(conn, Length):
+	Data = b''
+
+	while len(Data) < Length:
+		if not (Chunk := conn.recv(Length - len(Data))):
+			raise ConnectionError('The other server process closed the connection.')
+
+		Data += Chunk
+
+	return Data
+
+
+def Send(conn, Data, fds):
+	"""Send a pickled object, plus some file descriptors (in chunks, as only so many fit in one message)"""
+
+	Chunks = [fds[i:i + 200] for i in range(0, len(fds), 200)]
+	conn.sendall(struct.pack('>I', len(Chunks)))
+
+	for Chunk in Chunks:
+		socket.send_fds(conn, [b'F'], Chunk)
+
+	conn.sendall(Record(Data))
+
+
+def Receive(conn):
+	fds = []
+
+	for i in range(struct.unpack('>I', ReceiveExactly(conn, 4))[0]):
+		Message, Chunk, Flags, Address = socket.recv_fds(conn, 1, 200)
+		fds.extend(Chunk)
+
+	Length = struct.unpack('>I', ReceiveExactly(conn, 4))[0]
+	return pickle.loads(ReceiveExactly(conn, Length)), fds
+
+
+class Handover(object):
+	"""
+
+	Listens on a Unix socket for a new server process wanting to take over from this one.
+
+	Before anything is handed over, the server has to stop touching its sockets: it stops accepting connections...
+	...and the threads handling its players' connections finish the message they're on, then stop waiting for the next.
+	Any messages that arrive after that are left in the sockets, to be read by the new server.
+
+	"""
+
+	__slots__ = 'Path', 'Listener', 'Started', 'WakeRead', 'WakeWrite'
+
+	def __init__(self, Path):
+		self.Path = Path
+		self.Started = False
+		self.WakeRead, self.WakeWrite = os.pipe()
+
+		try:
+			os.unlink(Path)
+		except FileNotFoundError:
+			pass
+
+		self.Listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		self.Listener.bind(Path)
+		self.Listener.listen(1)
+
+	def Waiting(self, conn):
+		"""Block until there is a message to read from conn; returns False if the server is being handed over instead"""
+
+		select.select([conn, self.WakeRead], [], [])
+		return not self.Started
+
+	def Serve(self, lobby, Server, AcceptThread):
+		"""Wait for a new server process to ask to take over, then hand everything over to it"""
+
+		Thread(target=self.Run, args=(lobby, Server, AcceptThread), daemon=True).start()
+
+	def Run(self, lobby, Server, AcceptThread):
+		conn, addr = self.Listener.accept()
+		print(f'A new server process is taking over at {GetTime()}; handing the tables over.\n')
+
+		# (The pipe is never emptied, so everything waiting on it wakes up, now and from now on.)
+		self.Started = True
+		os.write(self.WakeWrite, b'!')
+
+		AcceptThread.join()
+
+		while Server.ClientThreads:
+			sleep(0.01)
+
+		Tables = lobby.HandOver()
+		Sockets = [Server.conn] + [sock for TableID, State, Connections in Tables for sock, addr, Position in Connections]
+
+		Send(conn, [
+			(TableID, State, [(addr, Position) for sock, addr, Position in Connections])
+			for TableID, State, Connections in Tables
+		], [sock.fileno() for sock in Sockets])
+
+		# Wait until the new server has taken over before this one stops.
+		conn.recv(1)
+		conn.close()
+		self.Listener.close()
+
+		print(f'Handed {len(Tables)} table(s) and {len(Sockets) - 1} connection(s) over at {GetTime()}.\n')
+		lobby.HandedOver = True
+		lobby.Finished.set()
+
+
+def TakeOver(Path):
+	"""
+
+	Ask the server listening on the Unix socket at Path to hand everything over to this process.
+	Returns the listening socket, the tables' states with their players' connections...
+	...and the connection to the old server, which should be closed (see Acknowledge) once this server is ready.
+
+	"""
+
+	conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	conn.connect(Path)
+
+	Tables, fds = Receive(conn)
+	Sockets = iter(socket.socket(fileno=fd) for fd in fds)
+	Listener = next(Sockets)
+
+	Tables = [
+		(TableID, State, [(next(Sockets), tuple(addr), Position) for addr, Position in Connections])
+		for TableID, State, Connections in Tables
+	]
+
+	return Listener, Tables, conn
+
+
+def Acknowledge(conn):
+	conn.sendall(b'K')
+	conn.close()